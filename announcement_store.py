@@ -0,0 +1,116 @@
+import os
+import json
+import threading
+from datetime import datetime
+
+ANNOUNCEMENTS_DIR = os.path.join("downloads", ".cache", "announcements")
+# NSE announcement timestamps look like "06-Sep-2025 17:31:24"
+AN_DT_FORMAT = "%d-%b-%Y %H:%M:%S"
+
+def parse_an_dt(value):
+    """Parses an NSE 'an_dt' timestamp, or returns None."""
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in (AN_DT_FORMAT, "%d-%b-%Y"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def announcement_key(item):
+    """Stable identity of an announcement, used to merge overlapping syncs."""
+    return item.get('attchmntFile') or f"{item.get('seq_id', '')}|{item.get('an_dt', '')}|{item.get('desc', '')}"
+
+class AnnouncementStore:
+    """
+    Local copy of the corporate announcements we care about, one JSON file per
+    symbol, plus a watermark: the newest 'an_dt' seen by the last successful
+    sync. Later syncs only ask NSE for announcements after the watermark.
+    """
+
+    def __init__(self, root=ANNOUNCEMENTS_DIR):
+        self.root = root
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+
+    def _path(self, symbol):
+        return os.path.join(self.root, f"{symbol.upper()}.json")
+
+    def _lock(self, symbol):
+        with self._locks_lock:
+            return self._locks.setdefault(symbol.upper(), threading.Lock())
+
+    def load(self, symbol):
+        path = self._path(symbol)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"  [Announcements] Ignoring unreadable store {path}: {e}")
+        return {"symbol": symbol.upper(), "watermark": None, "announcements": []}
+
+    def watermark(self, symbol):
+        """Newest announcement time already synced for symbol, or None."""
+        return parse_an_dt(self.load(symbol).get("watermark"))
+
+    def merge(self, symbol, items, seen_until=None):
+        """
+        Adds announcements to the symbol's store (duplicates are ignored) and
+        moves the watermark forward to seen_until. Returns the added items.
+        """
+        with self._lock(symbol):
+            state = self.load(symbol)
+            known = {announcement_key(a) for a in state["announcements"]}
+            added = []
+            for item in items:
+                key = announcement_key(item)
+                if key not in known:
+                    known.add(key)
+                    state["announcements"].append(item)
+                    added.append(item)
+
+            current = parse_an_dt(state.get("watermark"))
+            if seen_until and (current is None or seen_until > current):
+                state["watermark"] = seen_until.strftime(AN_DT_FORMAT)
+            state["synced_at"] = datetime.now().isoformat()
+
+            os.makedirs(self.root, exist_ok=True)
+            path = self._path(symbol)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, path)
+            return added
+
+    def _sweep_path(self):
+        return os.path.join(self.root, "_sweep.json")
+
+    def sweep_coverage(self):
+        """(start, end) of the announcement window covered by bulk sweeps, or None."""
+        path = self._sweep_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            return datetime.fromisoformat(saved["from"]), datetime.fromisoformat(saved["until"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"  [Announcements] Ignoring unreadable sweep record: {e}")
+            return None
+
+    def record_sweep(self, start, end):
+        """Records that every announcement between start and end has been swept."""
+        with self._lock("_sweep"):
+            coverage = self.sweep_coverage()
+            if coverage and start <= coverage[1] and end >= coverage[0]:
+                # Overlapping sweeps extend the covered window
+                start, end = min(start, coverage[0]), max(end, coverage[1])
+            os.makedirs(self.root, exist_ok=True)
+            path = self._sweep_path()
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"from": start.isoformat(), "until": end.isoformat()}, f, indent=2)
+            os.replace(tmp_path, path)
@@ -1,55 +1,167 @@
 import requests
-from bs4 import BeautifulSoup
 import os
 import re
+import sys
+import json
 import time
-import random
+import string
+import threading
+from rate_limiter import get_rate_limiter
+from http_client import new_session, request_with_retry
+from response_cache import get_response_cache
+from name_index import NameIndex, confident_match
+from html_parser import make_soup, extract_links
+
+# Local directory of annualreports.com company pages, crawled from the A-Z
+# listing so lookups do not need a search request per company
+DIRECTORY_INDEX = os.path.join("downloads", ".cache", "annualreports_directory.json")
+DIRECTORY_PAGES = list(string.ascii_uppercase) + ["0-9"]
+# Listing pages older than this are re-crawled by refresh_directory()
+DIRECTORY_MAX_AGE = 30 * 24 * 3600
+# Non-exact directory matches scoring at least this (and clearly ahead of the
+# runner-up) are trusted without a live search
+LOCAL_MATCH_SCORE = 0.8
+# Company page links, absolute or relative: /Company/<slug>
+COMPANY_URL_RE = re.compile(r'^(?:https?://(?:www\.)?annualreports\.com)?/Company/([^/?#]+)')
 
 class AnnualReportsClient:
     BASE_URL = "https://www.annualreports.com"
+    # Search answers barely change; keep them for a week (seconds)
+    SEARCH_CACHE_TTL = 7 * 24 * 3600
 
-    def __init__(self):
+    def __init__(self, cache=None, directory=DIRECTORY_INDEX):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Referer": "https://www.annualreports.com/",
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
         }
-        self.session = requests.Session()
-        self.session.headers.update(self.headers)
+        self.session = new_session(self.headers)
+        self.rate_limiter = get_rate_limiter()
+        self.cache = cache or get_response_cache()
+        self.directory_path = directory
+        self._directory = None
+        self._directory_index = None
+        self._directory_lock = threading.Lock()
 
-    def _request_with_retry(self, url, timeout=30, max_retries=3):
-        for attempt in range(max_retries):
-            try:
-                # Polite delay
-                time.sleep(random.uniform(1.0, 3.0))
-                
-                response = self.session.get(url, timeout=timeout)
-                
-                if response.status_code == 429:
-                    wait_time = (2 ** attempt) * 5
-                    print(f"  [Rate Limit] Sleeping {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                elif response.status_code >= 500:
-                    print(f"  [Server Error] {response.status_code}. Retrying...")
-                    time.sleep(2)
-                    continue
-                    
-                return response
-            except requests.RequestException as e:
-                print(f"  [Network Error] {e}")
-                time.sleep(2)
-        return None
+    def _request_with_retry(self, url, timeout=30, max_retries=3, cache_ttl=None):
+        """
+        With cache_ttl, a stored answer younger than that is returned without
+        touching the network. Callers store answers themselves once they have
+        parsed them, so a block or challenge page is never cached.
+        """
+        cached = self.cache.get(url, cache_ttl)
+        if cached is not None:
+            return cached
+        return request_with_retry(self.session, url, max_retries=max_retries, timeout=timeout)
+
+    def _load_directory(self):
+        if self._directory is None:
+            self._directory = {"pages": {}, "companies": {}}
+            if self.directory_path and os.path.exists(self.directory_path):
+                try:
+                    with open(self.directory_path, 'r', encoding='utf-8') as f:
+                        self._directory = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"  Ignoring unreadable annualreports.com directory: {e}")
+        return self._directory
+
+    def _save_directory(self):
+        if not self.directory_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.directory_path) or ".", exist_ok=True)
+            tmp_path = f"{self.directory_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._directory, f)
+            os.replace(tmp_path, self.directory_path)
+        except OSError as e:
+            print(f"  Could not save annualreports.com directory: {e}")
+
+    def _add_to_directory(self, companies):
+        """Merges {slug: [name, exchange]} into the directory. Caller holds the lock."""
+        directory = self._load_directory()
+        for slug, (name, exchange) in companies.items():
+            old = directory["companies"].get(slug)
+            # Keep a known exchange when the new source (e.g. live search) has none
+            directory["companies"][slug] = [name, exchange or (old[1] if old else None)]
+        self._directory_index = None
+
+    def _parse_listing(self, html):
+        """Company links on a listing page: {slug: [name, exchange]}."""
+        soup = make_soup(html)
+        companies = {}
+        for link in soup.find_all('a', href=True):
+            match = COMPANY_URL_RE.match(link['href'])
+            name = link.get_text(" ", strip=True)
+            if not match or not name:
+                continue
+            exchange = None
+            row = link.find_parent(['tr', 'li'])
+            if row is not None:
+                cell = row.find(class_=re.compile('exchange', re.I))
+                if cell is not None:
+                    exchange = cell.get_text(" ", strip=True) or None
+            companies[match.group(1)] = [name, exchange]
+        return companies
+
+    def refresh_directory(self, max_age=DIRECTORY_MAX_AGE, pages=None):
+        """
+        Crawls the A-Z company listing into the local directory. Only pages
+        older than max_age are fetched again, and progress is saved after each
+        page, so an interrupted crawl resumes where it stopped.
+        Returns the number of pages fetched.
+        """
+        fetched = 0
+        for page in pages or DIRECTORY_PAGES:
+            with self._directory_lock:
+                last = self._load_directory()["pages"].get(page, 0)
+            if time.time() - last < max_age:
+                continue
+
+            print(f"Crawling annualreports.com companies '{page}'...")
+            response = self._request_with_retry(f"{self.BASE_URL}/Companies?a={page}", timeout=30)
+            if response is None or response.status_code != 200:
+                print(f"  Listing '{page}' failed ({getattr(response, 'status_code', 'no response')}), will retry next refresh")
+                continue
+            companies = self._parse_listing(response.content)
+            with self._directory_lock:
+                self._add_to_directory(companies)
+                self._directory["pages"][page] = time.time()
+                self._save_directory()
+            fetched += 1
+            print(f"  {len(companies)} companies")
+        return fetched
+
+    def directory_index(self):
+        """NameIndex over the local directory (empty until refresh_directory() has run)."""
+        with self._directory_lock:
+            if self._directory_index is None:
+                records = [
+                    {"name": name, "slug": slug, "exchange": exchange,
+                     "url": f"{self.BASE_URL}/Company/{slug}"}
+                    for slug, (name, exchange) in self._load_directory()["companies"].items()
+                ]
+                self._directory_index = NameIndex(records, key_fields=("slug",))
+            return self._directory_index
 
     def search_company(self, query):
         """
         Search for a company on annualreports.com
         Returns a list of dicts: {'name': 'Company Name', 'url': '/Company/company-name'}
+
+        The local company directory is searched first. The live search is the
+        fallback when no directory match is exact or clearly ahead of the others,
+        and its hits are added to the directory.
         """
+        local = self.directory_index().search(query)
+        if confident_match(local, LOCAL_MATCH_SCORE):
+            print(f"Resolved '{query}' from local annualreports.com directory: {local[0]['slug']}")
+            return local
+
         search_url = f"{self.BASE_URL}/filter?q={query}"
         try:
             print(f"Searching annualreports.com for '{query}'...")
-            response = self._request_with_retry(search_url, timeout=20)
+            response = self._request_with_retry(search_url, timeout=20, cache_ttl=self.SEARCH_CACHE_TTL)
             if not response:
                 return []
                 
@@ -67,6 +179,18 @@ class AnnualReportsClient:
                         "name": item.get("label"),
                         "url": self.BASE_URL + item.get("value")
                     })
+                if response.headers.get('X-Cache') != 'HIT':
+                    self.cache.set(search_url, response)
+                # Remember live hits so the next lookup of this name stays local
+                hits = {}
+                for r in results:
+                    match = COMPANY_URL_RE.match(r["url"] or "")
+                    if match and r["name"]:
+                        hits[match.group(1)] = [r["name"], None]
+                if hits:
+                    with self._directory_lock:
+                        self._add_to_directory(hits)
+                        self._save_directory()
                 return results
             except ValueError:
                 print(f"Error parsing JSON from search: {response.text[:100]}")
@@ -89,17 +213,17 @@ class AnnualReportsClient:
                 
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
             reports = []
             
             # Locate the section containing reports. 
             # Usually strict structure: Year -> Link
             # Heuristic: Find links ending in .pdf or containing "View Annual Report"
             
-            links = soup.find_all('a', href=True)
+            # Only links are needed, so the page is streamed rather than parsed into a tree
+            links = extract_links(response.text)
             for link in links:
                 href = link['href']
-                text = link.text.strip()
+                text = link['text']
                 
                 # Filter for PDF links
                 if '.pdf' in href.lower() or 'download' in text.lower():
@@ -170,7 +294,7 @@ class AnnualReportsScraper:
 
             print(f"Downloading {filename} from {url}...")
             try:
-                r = requests.get(url, headers=self.client.headers, stream=True)
+                r = self.client.session.get(url, stream=True)
                 r.raise_for_status()
                 with open(filepath, 'wb') as f:
                     for chunk in r.iter_content(chunk_size=8192):
@@ -178,3 +302,11 @@ class AnnualReportsScraper:
                 print(f"Downloaded {filepath}")
             except Exception as e:
                 print(f"Failed to download {url}: {e}")
+
+
+if __name__ == "__main__":
+    # python annual_reports_client.py [--full]  -> crawl stale (or all) directory pages
+    full = "--full" in sys.argv[1:]
+    client = AnnualReportsClient()
+    pages = client.refresh_directory(max_age=0 if full else DIRECTORY_MAX_AGE)
+    print(f"Fetched {pages} listing pages; directory has {len(client.directory_index())} companies")
@@ -0,0 +1,129 @@
+import os
+import sys
+import time
+import sqlite3
+import threading
+
+ARTICLE_CACHE_DB = os.path.join("downloads", ".cache", "articles.sqlite")
+# Extracted text kept across runs; least recently used articles go first
+ARTICLE_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+class ArticleCache:
+    """
+    Persistent cache of extracted news article text in SQLite, keyed by the
+    article URL from the feed and also findable by the URL it redirected to.
+    Looked up before any network call, so a daily refresh only fetches
+    articles it has not seen. Articles stay until the cache outgrows
+    max_bytes; then the least recently used are evicted.
+
+    SCRAPER_CACHE=refresh skips reads (fresh text is still stored);
+    SCRAPER_CACHE=off disables the cache entirely.
+    """
+
+    def __init__(self, path=ARTICLE_CACHE_DB, max_bytes=ARTICLE_CACHE_MAX_BYTES, bypass=False, enabled=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+        self._total = 0
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS articles ("
+                " url TEXT PRIMARY KEY, resolved_url TEXT, text TEXT, size INTEGER,"
+                " fetched_at REAL, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS articles_resolved ON articles(resolved_url)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS articles_last_used ON articles(last_used)")
+            self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        return self._conn
+
+    def get_many(self, urls):
+        """
+        Cached articles for urls: {url: {text, resolved_url, fetched_at}}.
+        URLs that were never extracted are missing from the result.
+        """
+        if not self.enabled or self.bypass or not urls:
+            return {}
+        found = {}
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            for url in urls:
+                row = conn.execute(
+                    "SELECT url, resolved_url, text, fetched_at FROM articles"
+                    " WHERE url = ? OR resolved_url = ? LIMIT 1", (url, url)
+                ).fetchone()
+                if row:
+                    found[url] = {"text": row[2], "resolved_url": row[1], "fetched_at": row[3]}
+                    conn.execute("UPDATE articles SET last_used = ? WHERE url = ?", (now, row[0]))
+            conn.commit()
+        return found
+
+    def set_many(self, articles):
+        """Stores {url: (text, resolved_url)} and evicts old articles if over budget."""
+        if not self.enabled or not articles:
+            return
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            for url, (text, resolved_url) in articles.items():
+                size = len((text or "").encode('utf-8')) + len(url) + len(resolved_url or "")
+                old = conn.execute("SELECT size FROM articles WHERE url = ?", (url,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO articles (url, resolved_url, text, size, fetched_at, last_used)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, resolved_url, text or "", size, now, now)
+                )
+                self._total += size - (old[0] if old else 0)
+            self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn):
+        """Drops least recently used articles until the cache is back under 90% of max_bytes."""
+        if self._total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        removed = 0
+        for url, size in conn.execute("SELECT url, size FROM articles ORDER BY last_used").fetchall():
+            if self._total <= target:
+                break
+            conn.execute("DELETE FROM articles WHERE url = ?", (url,))
+            self._total -= size
+            removed += 1
+        print(f"  [ArticleCache] Evicted {removed} least recently used articles")
+
+    def invalidate(self, url_prefix=""):
+        """Drops cached articles whose URL starts with url_prefix (everything by default)."""
+        with self._lock:
+            conn = self._connect()
+            cur = conn.execute(
+                "DELETE FROM articles WHERE substr(url, 1, ?) = ?", (len(url_prefix), url_prefix)
+            )
+            self._total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+            conn.commit()
+            return cur.rowcount
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_article_cache():
+    """Returns the article cache shared by every NewsScraper in the process."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            mode = os.environ.get("SCRAPER_CACHE", "").lower()
+            _cache = ArticleCache(bypass=(mode == "refresh"), enabled=(mode != "off"))
+        return _cache
+
+
+if __name__ == "__main__":
+    # python article_cache.py [url-prefix]  -> invalidate matching entries
+    prefix = sys.argv[1] if len(sys.argv) > 1 else ""
+    removed = ArticleCache().invalidate(prefix)
+    print(f"Removed {removed} cached articles" + (f" for {prefix}" if prefix else ""))
@@ -0,0 +1,178 @@
+import os
+import sys
+import json
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+STORE_DIR = os.path.join("downloads", ".store")
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Returns the SHA-256 hex digest of a file."""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+class ArtifactStore:
+    """
+    Content-addressed storage for downloaded reports.
+
+    Every file is kept once under objects/<sha[:2]>/<sha>, and the per-company
+    folders hold hardlinks to those objects (or copies where hardlinks are not
+    supported). index.sqlite remembers which URL produced which hash, so a URL
+    that was already fetched for another company or source is linked instead of
+    downloaded again.
+    """
+
+    def __init__(self, root=STORE_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.results_dir = os.path.join(root, "results")
+        self.index_path = os.path.join(root, "index.sqlite")
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            # Several batch processes may share the store; wait for their writes
+            self._conn = sqlite3.connect(self.index_path, timeout=30, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS urls ("
+                " url TEXT PRIMARY KEY, sha256 TEXT, size INTEGER, etag TEXT, last_modified TEXT)"
+            )
+            self._import_legacy_index(self._conn)
+        return self._conn
+
+    def _import_legacy_index(self, conn):
+        """Moves the URL records of an index.json from older versions into the table."""
+        legacy_path = os.path.join(self.root, "index.json")
+        if not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                urls = json.load(f).get("urls", {})
+            conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, sha256, size, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                [(url, e["sha256"], e.get("size"), e.get("etag"), e.get("last_modified")) for url, e in urls.items()]
+            )
+            conn.commit()
+            os.replace(legacy_path, legacy_path + ".imported")
+            print(f"  [Store] Imported {len(urls)} URLs from {legacy_path}")
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            print(f"  [Store] Ignoring unreadable index {legacy_path}: {e}")
+
+    def _url_entry(self, url):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT sha256, size, etag, last_modified FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        if not row:
+            return {}
+        return {"sha256": row[0], "size": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def has(self, sha256):
+        return os.path.exists(self.object_path(sha256))
+
+    def lookup_url(self, url):
+        """Returns the hash stored for a URL, or None if unknown or no longer on disk."""
+        entry = self._url_entry(url)
+        if entry and self.has(entry["sha256"]):
+            return entry["sha256"]
+        return None
+
+    def link(self, sha256, dest):
+        """Materializes a stored object at dest, replacing whatever is there."""
+        src = self.object_path(sha256)
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        tmp_path = dest + ".link"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(src, tmp_path)
+        except OSError:
+            # Different filesystem or no hardlink support
+            shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dest)
+        return dest
+
+    def url_record(self, url):
+        """Returns what the index knows about a URL (hash, size and HTTP validators)."""
+        entry = self._url_entry(url)
+        if entry:
+            entry["url"] = url
+        return entry
+
+    def ingest(self, path, sha256=None, url=None, etag=None, last_modified=None):
+        """
+        Moves a finished file into the store and leaves a link in its place.
+        Returns (sha256, is_duplicate); is_duplicate is True when the content was
+        already stored, e.g. the same report from another source or company.
+        """
+        if sha256 is None:
+            sha256 = hash_file(path)
+        obj_path = self.object_path(sha256)
+
+        with self._lock:
+            is_duplicate = os.path.exists(obj_path)
+            if is_duplicate:
+                if not os.path.samefile(path, obj_path):
+                    self.link(sha256, path)
+            else:
+                os.makedirs(os.path.dirname(obj_path), exist_ok=True)
+                os.replace(path, obj_path)
+                self.link(sha256, path)
+
+            if url:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO urls (url, sha256, size, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                    (url, sha256, os.path.getsize(obj_path), etag, last_modified)
+                )
+                conn.commit()
+
+        return sha256, is_duplicate
+
+    def ingest_tree(self, folder, extensions=(".pdf",)):
+        """
+        Moves every matching file under folder into the store, collapsing
+        identical files across company folders into one object.
+        Returns (files_seen, duplicates_found, bytes_saved).
+        """
+        seen = duplicates = saved = 0
+        for root, dirs, files in os.walk(folder):
+            # Never descend into the store itself
+            dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != os.path.abspath(self.root)]
+            for name in files:
+                if not name.lower().endswith(extensions):
+                    continue
+                path = os.path.join(root, name)
+                if os.stat(path).st_nlink > 1:
+                    # Already linked into the store
+                    seen += 1
+                    continue
+                size = os.path.getsize(path)
+                _, is_duplicate = self.ingest(path)
+                seen += 1
+                if is_duplicate:
+                    duplicates += 1
+                    saved += size
+        return seen, duplicates, saved
+
+    def result_path(self, sha256, suffix=".json"):
+        """Location for derived data (e.g. BRSR extraction output) keyed by content hash."""
+        return os.path.join(self.results_dir, sha256[:2], sha256 + suffix)
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "downloads"
+    store = ArtifactStore()
+    print(f"Deduplicating files under {target} into {store.root}...")
+    seen, duplicates, saved = store.ingest_tree(target)
+    print(f"Processed {seen} files, {duplicates} duplicates, {saved / 1024 / 1024:.2f} MB saved")
@@ -0,0 +1,276 @@
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from annual_reports_client import AnnualReportsClient
+from nse_client import NSEClient
+from artifact_store import ArtifactStore
+from downloader import DownloadEngine
+from response_cache import get_response_cache
+from company_identity import CompanyResolver
+from scraper import DOWNLOAD_BASE, StepTracker, queue_brsr_report, resolve_company, run_pipeline, sanitize_filename
+
+JOBS_DB = os.path.join("downloads", ".cache", "jobs.sqlite")
+
+class JobTable:
+    """
+    Persistent job table for batch runs: one row per company and one per
+    (company, step), so a restarted run resumes exactly where it stopped.
+    """
+
+    def __init__(self, path=JOBS_DB):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS companies ("
+            " company TEXT PRIMARY KEY, status TEXT, attempts INTEGER DEFAULT 0,"
+            " error TEXT, updated_at TEXT);"
+            "CREATE TABLE IF NOT EXISTS steps ("
+            " company TEXT, step TEXT, status TEXT, error TEXT, updated_at TEXT,"
+            " PRIMARY KEY (company, step));"
+        )
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cur = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cur
+
+    def enqueue(self, companies):
+        """Adds companies that are not in the table yet. Returns how many were added."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO companies (company, status, updated_at) VALUES (?, 'pending', ?)",
+                [(c, now) for c in companies]
+            )
+            self._conn.commit()
+            return self._conn.total_changes - before
+
+    def pending(self, retry_failed=False):
+        """Companies still to process; 'running' ones were interrupted by a crash."""
+        statuses = ["pending", "running"] + (["failed"] if retry_failed else [])
+        marks = ",".join("?" for _ in statuses)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT company FROM companies WHERE status IN ({marks}) ORDER BY rowid", statuses
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def set_company(self, company, status, error=None):
+        attempts = ", attempts = attempts + 1" if status == "running" else ""
+        self._execute(
+            f"UPDATE companies SET status = ?, error = ?, updated_at = ?{attempts} WHERE company = ?",
+            (status, error, datetime.now().isoformat(), company)
+        )
+
+    def step_status(self, company, step):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM steps WHERE company = ? AND step = ?", (company, step)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_step(self, company, step, status, error=None):
+        self._execute(
+            "INSERT OR REPLACE INTO steps (company, step, status, error, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (company, step, status, error, datetime.now().isoformat())
+        )
+
+    def summary(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM companies GROUP BY status").fetchall()
+        return dict(rows)
+
+class JobTracker(StepTracker):
+    """StepTracker backed by the job table: finished steps are skipped on restart."""
+
+    def __init__(self, table, company):
+        self.table = table
+        self.company = company
+        self.errors = []
+
+    def should_run(self, step):
+        return self.table.step_status(self.company, step) != "done"
+
+    def start(self, step):
+        self.table.set_step(self.company, step, "running")
+
+    def done(self, step):
+        self.table.set_step(self.company, step, "done")
+
+    def failed(self, step, error):
+        self.errors.append(f"{step}: {error}")
+        self.table.set_step(self.company, step, "failed", error)
+
+def read_company_list(path):
+    """
+    Reads company names or NSE symbols, one per line ('#' starts a comment).
+    CSV files with a SYMBOL column (e.g. NSE's EQUITY_L.csv) use that column.
+    """
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        first = f.readline()
+        f.seek(0)
+        if ',' in first and 'SYMBOL' in first.upper():
+            reader = csv.DictReader(f)
+            column = next(c for c in reader.fieldnames if c.strip().upper() == 'SYMBOL')
+            names = [row[column].strip() for row in reader]
+        else:
+            names = [line.split('#', 1)[0].strip() for line in f]
+
+    seen = set()
+    companies = []
+    for name in names:
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            companies.append(name)
+    return companies
+
+_identity_locks = {}
+_identity_locks_guard = threading.Lock()
+
+def _identity_lock(key):
+    with _identity_locks_guard:
+        return _identity_locks.setdefault(key, threading.Lock())
+
+def _process_company(table, company, options, ar_client, nse_client, store, resolver):
+    table.set_company(company, "running")
+    # Steps are tracked per resolved company: aliases in the input list reuse
+    # the finished work of whichever spelling ran first, and never run at once
+    identity, folder = resolve_company(company, resolver)
+    tracker = JobTracker(table, identity['key'] if identity else folder)
+    try:
+        with _identity_lock(tracker.company):
+            run_pipeline(
+                company,
+                modal_url=options.get("modal_url"),
+                skip_news=options.get("skip_news", False),
+                skip_sustainability=options.get("skip_sustainability", False),
+                tracker=tracker,
+                ar_client=ar_client,
+                nse_client=nse_client,
+                store=store,
+                show_summary=False,
+                resolver=resolver,
+            )
+    except Exception as e:
+        tracker.errors.append(str(e))
+    status = "failed" if tracker.errors else "done"
+    table.set_company(company, status, "; ".join(tracker.errors) or None)
+    return status
+
+def run_batch(companies_file, workers=4, retry_failed=False, table=None, **options):
+    """Queues every company from companies_file and runs the pending ones on a worker pool."""
+    table = table or JobTable()
+    added = table.enqueue(read_company_list(companies_file))
+    todo = table.pending(retry_failed=retry_failed)
+    print(f"[Batch] {added} new companies queued, {len(todo)} to process with {workers} workers")
+    if not todo:
+        return table.summary()
+
+    # One set of clients for the whole batch: the NSE session is warmed up once
+    # and every worker shares the same connection pools and rate limits
+    ar_client = AnnualReportsClient()
+    nse_client = NSEClient()
+    store = ArtifactStore()
+    # Resolve names against local indexes instead of one search request per company
+    ar_client.refresh_directory()
+    nse_client.symbol_index()
+    resolver = CompanyResolver(nse_client, ar_client)
+
+    finished = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_process_company, table, company, options, ar_client, nse_client, store, resolver): company
+            for company in todo
+        }
+        for future in as_completed(futures):
+            company = futures[future]
+            finished += 1
+            try:
+                status = future.result()
+            except Exception as e:
+                status = f"error ({e})"
+            print(f"[Batch] {finished}/{len(todo)} {company}: {status}")
+
+    summary = table.summary()
+    print(f"[Batch] Job table: {summary}")
+    return summary
+
+def run_sweep(from_date, to_date=None, symbols=None, window_days=7, nse_client=None, store=None,
+              download_base=DOWNLOAD_BASE):
+    """
+    Finds new BRSR filings for every NSE equity with a few bulk announcement
+    requests, then downloads them as per-company jobs into
+    downloads/nseindia.com/{symbol}/BRSR. Pass symbols to keep only those companies.
+    """
+    nse_client = nse_client or NSEClient()
+    found = nse_client.sweep_brsr_announcements(from_date, to_date, window_days=window_days)
+    if symbols is not None:
+        wanted = {s.upper() for s in symbols}
+        found = {symbol: reports for symbol, reports in found.items() if symbol in wanted}
+
+    engine = DownloadEngine(store=store or ArtifactStore())
+    for symbol, reports in found.items():
+        brsr_folder = os.path.join(download_base, "nseindia.com", sanitize_filename(symbol), "BRSR")
+        os.makedirs(brsr_folder, exist_ok=True)
+        for report in reports:
+            queue_brsr_report(engine, report, brsr_folder, headers=nse_client.session.headers)
+
+    if engine.jobs:
+        print(f"[Batch] Downloading {len(engine.jobs)} BRSR filings for {len(found)} companies...")
+        engine.run()
+    return found
+
+def _parse_date(value):
+    return datetime.strptime(value, "%d-%m-%Y").date()
+
+def main():
+    parser = argparse.ArgumentParser(description="ESG & BRSR Data Scraper - Batch Mode")
+    parser.add_argument("--companies", help="File with one company name or NSE symbol per line (or a CSV with a SYMBOL column)")
+    parser.add_argument("--workers", type=int, default=4, help="Companies processed in parallel")
+    parser.add_argument("--modal-url", help="Modal App URL for BRSR Analysis")
+    parser.add_argument("--skip-news", action="store_true", help="Skip news and social media scraping")
+    parser.add_argument("--skip-sustainability", action="store_true", help="Skip sustainability reports scraping")
+    parser.add_argument("--retry-failed", action="store_true", help="Also re-run companies whose last run had failed steps")
+    parser.add_argument("--refresh-cache", action="store_true", help="Ignore cached NSE/AnnualReports.com API responses")
+    parser.add_argument("--jobs-db", default=JOBS_DB, help="Job table location")
+    parser.add_argument("--sweep-days", type=int, help="First sweep NSE announcements of the last N days for BRSR filings")
+    parser.add_argument("--sweep-from", type=_parse_date, help="Sweep start date (DD-MM-YYYY)")
+    parser.add_argument("--sweep-to", type=_parse_date, help="Sweep end date (DD-MM-YYYY, default today)")
+
+    args = parser.parse_args()
+
+    if not args.companies and not (args.sweep_days or args.sweep_from):
+        parser.error("give --companies, a sweep (--sweep-days / --sweep-from), or both")
+
+    if args.refresh_cache:
+        get_response_cache().bypass = True
+
+    if args.sweep_days or args.sweep_from:
+        sweep_from = args.sweep_from or datetime.now().date() - timedelta(days=args.sweep_days)
+        symbols = read_company_list(args.companies) if args.companies else None
+        run_sweep(sweep_from, args.sweep_to, symbols=symbols)
+
+    if not args.companies:
+        return
+
+    run_batch(
+        args.companies,
+        workers=args.workers,
+        retry_failed=args.retry_failed,
+        table=JobTable(args.jobs_db),
+        modal_url=args.modal_url,
+        skip_news=args.skip_news,
+        skip_sustainability=args.skip_sustainability,
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+import sqlite3
+from bs4 import BeautifulSoup
+from html_parser import HTML_FEATURES, extract_links, make_soup
+from news_scraper import parse_article
+from response_cache import CACHE_DB
+
+# python bench_html_parser.py [page.html ...]
+# Times the full-tree parsers against streaming link extraction on saved pages:
+# the given files, else HTML bodies in the response cache, else a synthetic page.
+
+def load_pages(paths):
+    pages = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages.append((os.path.basename(path), f.read()))
+    if pages:
+        return pages
+
+    if os.path.exists(CACHE_DB):
+        conn = sqlite3.connect(CACHE_DB)
+        rows = conn.execute(
+            "SELECT url, body FROM responses WHERE content_type LIKE '%html%' ORDER BY fetched_at DESC LIMIT 20"
+        ).fetchall()
+        pages = [(url, body.decode('utf-8', errors='replace')) for url, body in rows if body]
+    if pages:
+        return pages
+
+    rows = "".join(
+        f"<tr><td><a class='result__a' href='https://example.com/report_{i}.pdf'>Report {i}</a></td>"
+        f"<td class='exchange'>NSE</td><td><p>Filed in {2000 + i % 25}, see the report for details.</p></td></tr>"
+        for i in range(2000)
+    )
+    return [("synthetic", f"<html><body><div><div><table>{rows}</table></div></div></body></html>")]
+
+def bench(label, func, pages, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, html in pages:
+            func(html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"  {label:<40} {best * 1000:9.1f} ms")
+    return best
+
+def main():
+    pages = load_pages(sys.argv[1:])
+    size = sum(len(html) for _, html in pages)
+    print(f"{len(pages)} pages, {size / 1024:.0f} KB; tree builder: {HTML_FEATURES}")
+
+    print("\nAll <a href> links:")
+    base = bench("BeautifulSoup html.parser + find_all", lambda h: BeautifulSoup(h, 'html.parser').find_all('a', href=True), pages)
+    if HTML_FEATURES != "html.parser":
+        bench(f"BeautifulSoup {HTML_FEATURES} + find_all", lambda h: make_soup(h).find_all('a', href=True), pages)
+    fast = bench("extract_links (streaming)", extract_links, pages)
+    print(f"  speedup: {base / fast:.1f}x")
+
+    print("\nResult links (class result__a):")
+    base = bench("BeautifulSoup html.parser + find_all", lambda h: BeautifulSoup(h, 'html.parser').find_all('a', class_='result__a'), pages)
+    fast = bench("extract_links(class_=...)", lambda h: extract_links(h, class_='result__a'), pages)
+    print(f"  speedup: {base / fast:.1f}x")
+
+    print("\nArticle text (parse_article):")
+    bench(f"parse_article ({HTML_FEATURES})", parse_article, pages)
+
+if __name__ == "__main__":
+    main()
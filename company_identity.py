@@ -0,0 +1,163 @@
+import os
+import json
+import threading
+from datetime import datetime
+from name_index import normalize_name, confident_match
+from annual_reports_client import COMPANY_URL_RE, LOCAL_MATCH_SCORE
+
+# Canonical companies and the spellings that resolved to them
+IDENTITY_FILE = os.path.join("downloads", ".cache", "companies.json")
+
+def _exact(query, hit):
+    """The hit is the query itself: same symbol, ISIN, slug or normalized name."""
+    q = query.strip().lower()
+    if any((hit.get(field) or "").lower() == q for field in ("symbol", "isin", "slug")):
+        return True
+    return normalize_name(query) == normalize_name(hit.get("name"))
+
+def _plausible(query, hit):
+    """
+    Guards against search APIs that always return something: the hit must be
+    an exact match, or contain every word of the query in its name (the last
+    word may be a prefix, as in "Reliance Indus").
+    """
+    if not hit:
+        return False
+    if _exact(query, hit):
+        return True
+    words = normalize_name(query).split()
+    names = normalize_name(hit.get("name")).split()
+    if not words:
+        return False
+    return all(w in names for w in words[:-1]) and any(n.startswith(words[-1]) for n in names)
+
+def _unambiguous(query, hits):
+    """
+    Whether the first hit is certainly the company meant: an exact match, or a
+    local index match clearly ahead of the others. Only these are remembered.
+    """
+    if _exact(query, hits[0]):
+        return True
+    if "score" in hits[0]:
+        return confident_match(hits, LOCAL_MATCH_SCORE) is not None
+    # Live search results carry no scores; their first pick may be a guess
+    return False
+
+class CompanyResolver:
+    """
+    Resolves free-text company queries to one canonical identity, so
+    "Reliance", "Reliance Industries" and "Reliance Industries Limited" share
+    folders, downloads and analysis.
+
+    An identity is keyed by NSE symbol when the company is listed, else by
+    its annualreports.com slug. Every query is remembered as an alias of its
+    identity, so a repeated or differently spelled query resolves without
+    any lookup.
+    """
+
+    def __init__(self, nse_client=None, ar_client=None, path=IDENTITY_FILE):
+        self.nse_client = nse_client
+        self.ar_client = ar_client
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                data.setdefault("companies", {})
+                data.setdefault("aliases", {})
+                return data
+            except (OSError, ValueError) as e:
+                print(f"  [Identity] Ignoring unreadable alias table {self.path}: {e}")
+        return {"companies": {}, "aliases": {}}
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  [Identity] Could not save alias table: {e}")
+
+    def _find(self, symbol=None, ar_slug=None):
+        for identity in self._data["companies"].values():
+            if symbol and identity.get("symbol") == symbol:
+                return identity
+            if ar_slug and identity.get("ar_slug") == ar_slug:
+                return identity
+        return None
+
+    def lookup(self, query):
+        """The identity a query is already known as, or None."""
+        with self._lock:
+            key = self._data["aliases"].get(normalize_name(query))
+            identity = self._data["companies"].get(key) if key else None
+            return dict(identity) if identity else None
+
+    def resolve(self, query):
+        """
+        Returns the identity dict for query: key, name, symbol, isin, ar_slug,
+        ar_url. Unknown queries are looked up on NSE and annualreports.com and
+        keyed on the first hits, which are what the pipeline downloads. They are
+        remembered as aliases only when the match is plausible and unambiguous,
+        so an ambiguous name ("Tata") or an abbreviation ("SBI") is looked up
+        again next time rather than pinned to a guess.
+        """
+        known = self.lookup(query)
+        if known:
+            return known
+
+        nse_hits = self.nse_client.search_company(query) if self.nse_client else []
+        ar_hits = self.ar_client.search_company(query) if self.ar_client else []
+        # The pipeline steps download the first hit whether or not it looks like
+        # the query ("SBI" -> State Bank of India), so the run is keyed on it too;
+        # only plausible, unambiguous hits are remembered as aliases
+        nse_hit = nse_hits[0] if nse_hits else None
+        ar_hit = ar_hits[0] if ar_hits else None
+        symbol = nse_hit.get("symbol") if nse_hit else None
+        ar_slug = None
+        if ar_hit:
+            match = COMPANY_URL_RE.match(ar_hit.get("url") or "")
+            ar_slug = ar_hit.get("slug") or (match.group(1) if match else None)
+
+        if not symbol and not ar_slug:
+            # Nothing found to anchor an identity on
+            return {"key": normalize_name(query) or query, "name": query}
+
+        fields = {
+            "name": (nse_hit or {}).get("name") or (ar_hit or {}).get("name") or query,
+            "symbol": symbol,
+            "isin": (nse_hit or {}).get("isin"),
+            "ar_slug": ar_slug,
+            "ar_name": (ar_hit or {}).get("name"),
+            "ar_url": (ar_hit or {}).get("url"),
+        }
+        certain = all(_plausible(query, hit) and _unambiguous(query, hits)
+                      for hit, hits in ((nse_hit, nse_hits), (ar_hit, ar_hits)) if hit)
+
+        with self._lock:
+            identity = self._find(symbol, ar_slug)
+            if not certain:
+                print(f"  [Identity] '{query}' is not a certain match; using {symbol or ar_slug} for this run only. "
+                      f"Pass the full name or symbol to pin it.")
+                if identity:
+                    return dict(identity)
+                return dict(fields, key=symbol or f"ar-{ar_slug}")
+
+            if identity is None:
+                key = symbol or f"ar-{ar_slug}"
+                identity = self._data["companies"].setdefault(key, {"key": key, "created_at": datetime.now().isoformat()})
+            # Fill in whatever this lookup learned without overwriting known fields
+            for field, value in fields.items():
+                if value and not identity.get(field):
+                    identity[field] = value
+            self._data["aliases"][normalize_name(query)] = identity["key"]
+            self._save()
+            return dict(identity)
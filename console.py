@@ -0,0 +1,84 @@
+import io
+import sys
+import threading
+
+class ThreadRoutedStdout:
+    """
+    sys.stdout replacement that sends each thread's prints to the buffer that
+    thread is attached to, or to the real stdout when it has none. Lets
+    concurrent pipeline steps print freely and show their output as one block.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+
+    def current(self):
+        return getattr(self._local, 'buffer', None)
+
+    def attach(self, buffer):
+        """Routes this thread's output to buffer (None: back to the real stdout)."""
+        self._local.buffer = buffer
+
+    def write(self, text):
+        return (self.current() or self.stream).write(text)
+
+    def flush(self):
+        buffer = self.current()
+        if buffer is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+_install_lock = threading.Lock()
+
+def install():
+    """Installs the routing stdout once per process and returns it."""
+    with _install_lock:
+        if not isinstance(sys.stdout, ThreadRoutedStdout):
+            sys.stdout = ThreadRoutedStdout(sys.stdout)
+        return sys.stdout
+
+def current_buffer():
+    """The buffer this thread's prints go to, or None."""
+    out = sys.stdout
+    return out.current() if isinstance(out, ThreadRoutedStdout) else None
+
+def propagate(func):
+    """
+    Wraps func so that, whichever thread runs it, its output goes where the
+    calling thread's output goes. Use for work handed to thread pools.
+    """
+    buffer = current_buffer()
+    if buffer is None:
+        return func
+
+    def run(*args, **kwargs):
+        out = sys.stdout
+        previous = out.current()
+        out.attach(buffer)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            out.attach(previous)
+    return run
+
+class CapturedOutput:
+    """Context manager that collects everything this thread prints."""
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+
+    def __enter__(self):
+        self._out = install()
+        self._previous = self._out.current()
+        self._out.attach(self.buffer)
+        return self
+
+    def __exit__(self, *exc):
+        self._out.attach(self._previous)
+        return False
+
+    def getvalue(self):
+        return self.buffer.getvalue()
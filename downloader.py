@@ -0,0 +1,578 @@
+import os
+import hashlib
+import requests
+import sys
+import time
+import zipfile
+import json
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+from rate_limiter import get_rate_limiter
+from http_client import get_session
+from console import propagate
+
+# Suffix for in-progress downloads; only complete files carry the real name
+PART_SUFFIX = ".part"
+# Next to each .part file: the URL and validators of the response it came from
+PART_META_SUFFIX = ".part.json"
+MANIFEST_NAME = ".manifest.json"
+
+PDF_MAGIC = b'%PDF'
+ZIP_MAGIC = b'PK\x03\x04'
+PDF_EOF = b'%%EOF'
+# Bytes needed to classify a payload (enough to tell an XHTML page from an
+# XML instance), and how far from the end %%EOF may sit
+SNIFF_BYTES = 512
+EOF_WINDOW = 2048
+# Payload kinds accepted for each expected file type
+EXPECTED_KINDS = {
+    "pdf": ('pdf', 'zip'),
+    "xml": ('xml',),
+}
+
+# Engine threads can finish files in the same folder at once
+_manifest_locks = {}
+_manifest_locks_guard = threading.Lock()
+
+class DownloadManifest:
+    """
+    Per-folder record of where each file came from: URL, ETag, Last-Modified,
+    size and SHA-256. Lets re-runs ask the server whether a report changed
+    instead of downloading it again.
+    """
+
+    def __init__(self, folder):
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        key = os.path.abspath(self.path)
+        with _manifest_locks_guard:
+            self._lock = _manifest_locks.setdefault(key, threading.Lock())
+
+    def _load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def get(self, filename):
+        with self._lock:
+            return self._load().get(filename)
+
+    def update(self, filename, **fields):
+        """Merges fields into the entry for filename and writes the manifest back."""
+        with self._lock:
+            data = self._load()
+            entry = data.get(filename, {})
+            entry.update(fields)
+            data[filename] = entry
+            # The lock only covers this process; batch processes sharing the folder
+            # each write their own temp file
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            return entry
+
+def sniff_payload(head, content_type=''):
+    """Classifies the first bytes of a download as 'pdf', 'zip', 'html', 'xml' or 'unknown'."""
+    if head.startswith(PDF_MAGIC):
+        return 'pdf'
+    if head.startswith(ZIP_MAGIC):
+        return 'zip'
+    probe = head[:512].lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if probe.startswith((b'<!doctype', b'<html', b'<head', b'<body')) or b'<html' in probe:
+        return 'html'
+    if probe.startswith((b'<?xml', b'<xbrl')):
+        return 'xml'
+    if 'text/html' in content_type:
+        return 'html'
+    return 'unknown'
+
+def _write_part_meta(part_path, url, response):
+    meta = {
+        "url": url,
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified'),
+    }
+    with open(part_path[:-len(PART_SUFFIX)] + PART_META_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+def _read_part_meta(part_path):
+    try:
+        with open(part_path[:-len(PART_SUFFIX)] + PART_META_SUFFIX, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _if_range(meta):
+    """Validator for If-Range: a strong ETag, else Last-Modified, else None."""
+    etag = meta.get('etag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return meta.get('last_modified')
+
+def _discard_part(part_path, keep_data=False):
+    """Removes a .part file (unless keep_data) and its validator record."""
+    targets = [part_path[:-len(PART_SUFFIX)] + PART_META_SUFFIX]
+    if not keep_data:
+        targets.append(part_path)
+    for target in targets:
+        if os.path.exists(target):
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+
+def _copy_member(z, member, dest):
+    """
+    Streams one ZIP member to dest (via a .part file) while hashing it.
+    Returns the SHA-256, or None if the member is not a PDF.
+    """
+    sha = hashlib.sha256()
+    part_path = dest + PART_SUFFIX
+    with z.open(member) as src, open(part_path, 'wb') as out:
+        chunk = src.read(64 * 1024)
+        is_pdf = chunk.startswith(PDF_MAGIC)
+        while is_pdf and chunk:
+            out.write(chunk)
+            sha.update(chunk)
+            chunk = src.read(1024 * 1024)
+    if not is_pdf:
+        os.remove(part_path)
+        return None
+    os.replace(part_path, dest)
+    return sha.hexdigest()
+
+def _extract_zip_pdfs(zip_path, folder, filename, url, manifest, store):
+    """
+    Extracts every PDF from a downloaded archive. The first becomes filename,
+    the rest are saved next to it as <stem>_<member name>.pdf.
+    Returns the SHA-256 of the main PDF, or None if the archive holds none.
+    """
+    stem, ext = os.path.splitext(filename)
+    main_digest = None
+    try:
+        with zipfile.ZipFile(zip_path, 'r') as z:
+            pdfs = [n for n in z.namelist() if n.lower().endswith('.pdf')]
+            if not pdfs:
+                print("  [Error] No PDF found inside ZIP.")
+                return None
+            for member in pdfs:
+                if main_digest is None:
+                    target_name = filename
+                else:
+                    member_stem = os.path.splitext(os.path.basename(member))[0]
+                    target_name = f"{stem}_{member_stem}{ext}"
+                target = os.path.join(folder, target_name)
+                print(f"  [Info] Extracting {member} from zip as {target_name}...")
+                digest = _copy_member(z, member, target)
+                if digest is None:
+                    print(f"  [Error] {member} is not a valid PDF, skipped")
+                    continue
+                if main_digest is None:
+                    main_digest = digest
+                    continue
+                # Additional PDFs are tracked on their own
+                if store is not None:
+                    store.ingest(target, digest)
+                manifest.update(target_name, url=url, zip_member=member, sha256=digest,
+                                size=os.path.getsize(target), fetched_at=datetime.now().isoformat())
+    except zipfile.BadZipFile as e:
+        print(f"  [Error] Failed to extract ZIP: {e}")
+        return None
+    if main_digest:
+        print(f"  [Success] Extracted and saved as {filename}")
+    return main_digest
+
+def is_valid_pdf(path):
+    """Checks if a file starts with the %PDF signature."""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(5)
+            # Some PDFs might have a few bytes before %PDF, but usually it's at start
+            return header.startswith(b'%PDF')
+    except:
+        return False
+
+def is_valid_xml(path):
+    """Checks if a file starts like an XML document (e.g. an XBRL instance)."""
+    try:
+        with open(path, 'rb') as f:
+            return sniff_payload(f.read(SNIFF_BYTES)) == 'xml'
+    except:
+        return False
+
+def download_file(url, folder, filename, headers=None, max_retries=5, show_progress=True, store=None,
+                  expect="pdf"):
+    """
+    Downloads a report to folder/filename, extracting ZIP payloads and validating the PDF.
+    With expect="xml" the body must be an XML document instead (XBRL filings).
+
+    Bytes are streamed into filename.part and the file is renamed into place only
+    once complete. After a network error the next attempt (or the next run) resumes
+    the .part file with a Range request when the server supports it. The response's
+    ETag/Last-Modified are kept in filename.part.json and sent as If-Range, so a
+    file that changed on the server is downloaded again instead of spliced on.
+
+    With an ArtifactStore, content is hashed while it streams in and kept once in
+    the store; URLs the store already knows are linked without downloading them.
+
+    Each folder keeps a manifest of URL, ETag, Last-Modified, size and hash. When
+    an existing file has validators, the server is asked with If-None-Match /
+    If-Modified-Since and a 304 keeps the local copy.
+
+    Validation happens in the same pass as the download: the first bytes decide
+    whether the body is a PDF, a ZIP or a blocked HTML page (aborted at once),
+    and the tail is checked for the %%EOF trailer.
+    Returns the saved path, or None if the download failed.
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+
+    path = os.path.join(folder, filename)
+    part_path = path + PART_SUFFIX
+    accepted = EXPECTED_KINDS[expect]
+    is_valid = is_valid_xml if expect == "xml" else is_valid_pdf
+    manifest = DownloadManifest(folder)
+    entry = manifest.get(filename)
+    if entry and entry.get('url') != url:
+        entry = None
+
+    if not os.path.exists(path) and store is not None:
+        known_sha = store.lookup_url(url)
+        if known_sha:
+            store.link(known_sha, path)
+            print(f"  [Linked] {filename} (already stored as {known_sha[:12]})")
+            entry = manifest.update(filename, **store.url_record(url))
+
+    validators = None
+    if os.path.exists(path):
+        if is_valid(path):
+            if entry and (entry.get('etag') or entry.get('last_modified')):
+                validators = entry
+            else:
+                # Nothing to revalidate against (file predates the manifest)
+                print(f"  [Skipping] {filename} (already exists & valid)")
+                return path
+        else:
+            print(f"  [Re-downloading] {filename} (invalid/corrupt)")
+            try:
+                os.remove(path)
+            except:
+                pass
+
+    if validators:
+        print(f"  [Checking] {filename} for changes...")
+    else:
+        print(f"  [Downloading] {filename}...")
+
+    for attempt in range(max_retries):
+        try:
+            if headers is None:
+                headers = {
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+                    "Referer": "https://www.annualreports.com/"
+                }
+
+            # Ask for raw bytes so Range offsets match what is on disk
+            request_headers = dict(headers)
+            request_headers['Accept-Encoding'] = 'identity'
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            part_meta = _read_part_meta(part_path) if offset else None
+            if offset and (not part_meta or part_meta.get('url') != url or not _if_range(part_meta)):
+                # Nothing proves the partial bytes are from the current file
+                print(f"  [Info] Discarding unverifiable partial download of {filename}")
+                _discard_part(part_path)
+                offset = 0
+            if offset:
+                request_headers['Range'] = f"bytes={offset}-"
+                request_headers['If-Range'] = _if_range(part_meta)
+            if validators:
+                if validators.get('etag'):
+                    request_headers['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    request_headers['If-Modified-Since'] = validators['last_modified']
+
+            # Be polite: wait only if this host's request budget is used up
+            limiter = get_rate_limiter()
+            limiter.wait(url)
+
+            response = get_session().get(url, stream=True, timeout=60, headers=request_headers)
+
+            if validators and response.status_code == 304:
+                limiter.record_success(url)
+                print(f"  [Unchanged] {filename} (not modified since last fetch)")
+                manifest.update(filename, checked_at=datetime.now().isoformat())
+                return path
+
+            if response.status_code == 416:
+                # Our partial file no longer matches the remote one, start over
+                print(f"  [Info] Server rejected resume of {filename}, restarting from scratch")
+                _discard_part(part_path)
+                continue
+
+            if response.status_code == 429 or response.status_code >= 500:
+                # Adaptive backoff: the limiter lowers this host's rate and honors Retry-After
+                cooldown = limiter.record_throttle(url, response.headers.get('Retry-After'))
+                print(f"  [Rate Limited] HTTP {response.status_code}, backing off {cooldown:.0f}s before retry {attempt+1}/{max_retries}...")
+                continue
+
+            response.raise_for_status()
+
+            ctype = response.headers.get('Content-Type', '').lower()
+
+            sha = hashlib.sha256()
+            head = b''
+            tail = b''
+            if offset and response.status_code == 206 and _if_range({
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+            }) not in (None, _if_range(part_meta)):
+                # Server resumed, but from a different version of the file
+                print(f"  [Info] {filename} changed on the server, restarting from scratch")
+                response.close()
+                _discard_part(part_path)
+                continue
+            if offset and response.status_code == 206:
+                print(f"  [Resuming] {filename} from {offset / 1024 / 1024:.2f} MB")
+                mode = 'ab'
+                with open(part_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        if not head:
+                            head = chunk[:SNIFF_BYTES]
+                        sha.update(chunk)
+                        tail = (tail + chunk)[-EOF_WINDOW:]
+            else:
+                # Fresh download, or the server sent the whole (possibly changed)
+                # file instead of resuming: rewrite from zero
+                offset = 0
+                mode = 'wb'
+                _write_part_meta(part_path, url, response)
+
+            # Classify the payload from its first bytes, before writing anything
+            kind = sniff_payload(head, ctype) if head else None
+            pending = b''
+            total_size = int(response.headers.get('content-length', 0))
+            downloaded = offset
+
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    if kind is None:
+                        pending += chunk
+                        if len(pending) < SNIFF_BYTES:
+                            continue
+                        kind = sniff_payload(pending, ctype)
+                        if kind not in accepted:
+                            break
+                        chunk, pending = pending, b''
+                    f.write(chunk)
+                    sha.update(chunk)
+                    tail = (tail + chunk)[-EOF_WINDOW:]
+                    downloaded += len(chunk)
+                    if show_progress:
+                        # Print progress every ~1MB
+                        sys.stdout.write(f"\r  [Downloading] {filename} - {downloaded / 1024 / 1024:.2f} MB")
+                        sys.stdout.flush()
+                if kind is None and pending:
+                    # Body shorter than the sniff window
+                    kind = sniff_payload(pending, ctype)
+                    if kind in accepted:
+                        f.write(pending)
+                        sha.update(pending)
+                        tail = (tail + pending)[-EOF_WINDOW:]
+                        downloaded += len(pending)
+            if show_progress:
+                print()
+
+            if kind not in accepted:
+                # Blocked page or unexpected content: stop without downloading the rest
+                response.close()
+                _discard_part(part_path)
+                debug_path = path + ".debug.html"
+                with open(debug_path, 'wb') as f:
+                    f.write(pending or head)
+                if kind == 'html':
+                    print(f"  [Error] URL returned HTML instead of {expect.upper()} (blocked?): {url}")
+                    print(f"  [Debug] Saved response start to {debug_path}")
+                    # Likely blocked: treat it like a throttle so the host is slowed down
+                    if attempt < max_retries - 1:
+                        limiter.record_throttle(url)
+                        continue
+                else:
+                    print(f"  [Error] Downloaded file is not a valid {expect.upper()} header.")
+                    print(f"  [Debug] Header: {(pending or head)[:200]}")
+                    print(f"  [Debug] Saved response start to {debug_path}")
+                return None
+
+            limiter.record_success(url)
+
+            if total_size and downloaded < offset + total_size:
+                # Keep the .part file, the retry picks up from here
+                raise requests.exceptions.ConnectionError(
+                    f"Connection closed after {downloaded} of {offset + total_size} bytes"
+                )
+            if kind == 'pdf' and PDF_EOF not in tail:
+                if not total_size:
+                    # Without a Content-Length a missing trailer is our only truncation signal
+                    raise requests.exceptions.ConnectionError(
+                        f"PDF truncated after {downloaded} bytes (no %%EOF trailer)"
+                    )
+                print(f"  [Warning] {filename} has no %%EOF trailer, the PDF may be damaged")
+
+            print(f"  [Done] {filename} ({downloaded / 1024 / 1024:.2f} MB)")
+
+            if kind == 'zip':
+                print(f"  [Info] Detected ZIP file. Extracting...")
+                # Move the archive aside: the main PDF is extracted via the same .part name
+                zip_path = path + ".zip"
+                os.replace(part_path, zip_path)
+                _discard_part(part_path)
+                digest = _extract_zip_pdfs(zip_path, folder, filename, url, manifest, store)
+                os.remove(zip_path)
+                if not digest:
+                    return None
+            else:
+                os.replace(part_path, path)
+                _discard_part(part_path)
+                digest = sha.hexdigest()
+
+            record = {
+                "url": url,
+                "etag": response.headers.get('ETag'),
+                "last_modified": response.headers.get('Last-Modified'),
+                "size": os.path.getsize(path),
+                "sha256": digest,
+            }
+            if store is not None:
+                _, is_duplicate = store.ingest(path, digest, url=url, etag=record['etag'],
+                                               last_modified=record['last_modified'])
+                if is_duplicate:
+                    print(f"  [Dedup] {filename} matches stored content {digest[:12]}, linked")
+            now = datetime.now().isoformat()
+            manifest.update(filename, fetched_at=now, checked_at=now, **record)
+            # Successful download, break retry loop
+            return path
+
+        except requests.exceptions.RequestException as e:
+            print(f"\n  [Network Error] {e}")
+            if attempt < max_retries - 1:
+                wait_time = (2 ** attempt) * 2
+                print(f"  Retrying in {wait_time}s...")
+                time.sleep(wait_time)
+            else:
+                print(f"  [Failed] Max retries exceeded for {filename}")
+
+        except Exception as e:
+            print(f"\n  [Error] Failed to download {url}: {e}")
+            # Only temporaries go: a completed or revalidated report stays in place
+            _discard_part(part_path)
+            zip_path = path + ".zip"
+            if os.path.exists(zip_path):
+                try:
+                    os.remove(zip_path)
+                except OSError:
+                    pass
+            break
+
+    return None
+
+
+class DownloadEngine:
+    """
+    Fetches many reports in parallel on a thread pool, capping how many
+    downloads run against the same host at once.
+
+    Each job goes through download_file, so retries, ZIP extraction and
+    PDF validation behave exactly as for a single download. Pass an
+    ArtifactStore to deduplicate content across companies and sources.
+    on_complete(job, path) is called as each job finishes (path is None when
+    it failed), so callers can start on a file before the rest arrive.
+    """
+    # Both archives throttle aggressively, keep them to a couple of streams each
+    HOST_LIMITS = {
+        "nsearchives.nseindia.com": 2,
+        "www.nseindia.com": 2,
+        "www.annualreports.com": 2,
+        "annualreports.com": 2,
+    }
+    # Slots are shared by every engine in the process, so companies running in
+    # parallel (batch mode) still respect the per-host caps together
+    _host_slots = {}
+    _slots_lock = threading.Lock()
+
+    def __init__(self, max_workers=8, host_limits=None, default_host_limit=2, store=None, on_complete=None):
+        self.max_workers = max_workers
+        self.store = store
+        self.on_complete = on_complete
+        self.host_limits = dict(self.HOST_LIMITS)
+        if host_limits:
+            self.host_limits.update(host_limits)
+        self.default_host_limit = default_host_limit
+        self.jobs = []
+
+    def add(self, url, folder, filename, headers=None, expect="pdf", companion=None):
+        """
+        Queue a download. Headers are copied so callers may keep mutating theirs.
+        companion names another queued file that belongs with this one (e.g. a
+        report's XBRL instance), for on_complete callbacks that need both.
+        """
+        self.jobs.append({
+            "url": url,
+            "folder": folder,
+            "filename": filename,
+            "headers": dict(headers) if headers is not None else None,
+            "expect": expect,
+            "companion": companion,
+        })
+
+    def _slot_for(self, url):
+        host = urlparse(url).netloc.lower()
+        with DownloadEngine._slots_lock:
+            if host not in DownloadEngine._host_slots:
+                limit = self.host_limits.get(host, self.default_host_limit)
+                DownloadEngine._host_slots[host] = threading.BoundedSemaphore(limit)
+            return DownloadEngine._host_slots[host]
+
+    def _run_job(self, job):
+        with self._slot_for(job['url']):
+            return download_file(
+                job['url'], job['folder'], job['filename'],
+                headers=job['headers'], show_progress=False, store=self.store,
+                expect=job.get('expect', 'pdf')
+            )
+
+    def run(self):
+        """
+        Download every queued job and clear the queue.
+        Returns a list of (job, path) tuples; path is None for failed downloads.
+        """
+        jobs, self.jobs = self.jobs, []
+        if not jobs:
+            return []
+
+        print(f"  [Engine] Downloading {len(jobs)} files with up to {self.max_workers} workers...")
+        results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            # Worker prints follow the caller's output (e.g. a captured pipeline step)
+            futures = {pool.submit(propagate(self._run_job), job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    path = future.result()
+                except Exception as e:
+                    print(f"  [Error] {job['filename']}: {e}")
+                    path = None
+                results.append((job, path))
+                if self.on_complete is not None:
+                    try:
+                        self.on_complete(job, path)
+                    except Exception as e:
+                        print(f"  [Error] Completion callback for {job['filename']}: {e}")
+
+        ok = sum(1 for _, path in results if path)
+        print(f"  [Engine] {ok}/{len(jobs)} files downloaded or already present")
+        return results
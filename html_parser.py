@@ -0,0 +1,83 @@
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+# lxml (in requirements.txt) is the default tree builder; html.parser is the
+# fallback for installs where it failed to build
+try:
+    import lxml  # noqa: F401
+    HTML_FEATURES = "lxml"
+except ImportError:
+    HTML_FEATURES = "html.parser"
+
+def make_soup(markup):
+    """BeautifulSoup tree of markup, built with lxml (html.parser if lxml is missing)."""
+    return BeautifulSoup(markup, HTML_FEATURES)
+
+def _as_text(markup):
+    if isinstance(markup, bytes):
+        return markup.decode('utf-8', errors='replace')
+    return markup or ""
+
+class _LinkCollector(HTMLParser):
+    """Streams through a page collecting <a href> links, without building a tree."""
+
+    def __init__(self, class_=None):
+        super().__init__(convert_charrefs=True)
+        self.class_ = class_
+        self.links = []
+        self._current = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag != 'a':
+            return
+        # Anchors cannot nest; a new one closes the previous
+        self._finish()
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or "").split()
+        if attrs.get('href') is None or (self.class_ and self.class_ not in classes):
+            return
+        self._current = {"href": attrs['href'], "class": classes, "text": []}
+
+    def handle_endtag(self, tag):
+        if tag == 'a':
+            self._finish()
+
+    def handle_data(self, data):
+        if self._current is not None:
+            self._current["text"].append(data)
+
+    def _finish(self):
+        if self._current is not None:
+            self._current["text"] = "".join(self._current["text"]).strip()
+            self.links.append(self._current)
+            self._current = None
+
+    def close(self):
+        super().close()
+        self._finish()
+
+def extract_links(markup, class_=None):
+    """
+    Links in a page as dicts {href, text, class}, in document order, optionally
+    only those with CSS class class_. Streams the markup instead of building a
+    tree, for pages where the links are all we need.
+    """
+    collector = _LinkCollector(class_)
+    collector.feed(_as_text(markup))
+    collector.close()
+    return collector.links
+
+class _TextCollector(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+def html_to_text(markup):
+    """Text of an HTML fragment with the tags stripped, like BeautifulSoup's get_text()."""
+    collector = _TextCollector()
+    collector.feed(_as_text(markup))
+    collector.close()
+    return "".join(collector.parts)
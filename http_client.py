@@ -0,0 +1,118 @@
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from rate_limiter import get_rate_limiter
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_POOL_SIZE = 10
+# Keep-alive connections kept open per host; match roughly how many parallel
+# requests we allow against each site
+HOST_POOL_SIZES = {
+    "www.nseindia.com": 4,
+    "nsearchives.nseindia.com": 4,
+    "www.annualreports.com": 4,
+    "news.google.com": 16,
+}
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+# Connection-level failures (DNS, refused, reset before a response) are retried
+# by urllib3 itself; HTTP status handling lives in request_with_retry.
+CONNECT_RETRY = Retry(total=2, connect=2, read=0, status=0, redirect=10, backoff_factor=0.5)
+
+_adapters = None
+_adapters_lock = threading.Lock()
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def _get_adapters():
+    """Builds the transport adapters once; every session mounts the same ones so pools are shared."""
+    global _adapters
+    with _adapters_lock:
+        if _adapters is None:
+            adapters = {}
+            for scheme in ("https://", "http://"):
+                adapters[scheme] = HTTPAdapter(
+                    pool_connections=64, pool_maxsize=DEFAULT_POOL_SIZE, max_retries=CONNECT_RETRY
+                )
+            for host, size in HOST_POOL_SIZES.items():
+                adapters[f"https://{host}/"] = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=size, max_retries=CONNECT_RETRY
+                )
+            _adapters = adapters
+        return _adapters
+
+class PooledSession(requests.Session):
+    """
+    requests.Session that uses the process-wide connection pools and applies a
+    default timeout. Sessions keep their own cookies and headers but reuse
+    keep-alive connections with every other PooledSession.
+    """
+
+    def __init__(self, headers=None, timeout=DEFAULT_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+        for prefix, adapter in _get_adapters().items():
+            self.mount(prefix, adapter)
+        self.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.headers.update(headers)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+    def close(self):
+        # Adapters are shared; closing them here would drop other sessions' pools
+        pass
+
+def new_session(headers=None, timeout=DEFAULT_TIMEOUT):
+    """Returns a session with its own cookie jar, on the shared connection pools."""
+    return PooledSession(headers=headers, timeout=timeout)
+
+def get_session():
+    """Returns the shared session for requests that need no per-client state (RSS, articles, PDFs)."""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = PooledSession()
+        return _shared_session
+
+def request_with_retry(session, url, method="GET", max_retries=3, label="", **kwargs):
+    """
+    Common retry policy for API and page requests.
+
+    Waits on the shared rate limiter, backs off adaptively on 429/5xx (honoring
+    Retry-After) and retries network errors. Returns the response, or None once
+    all attempts failed.
+    """
+    limiter = get_rate_limiter()
+    prefix = f"{label} " if label else ""
+    for attempt in range(max_retries):
+        try:
+            # Polite delay, only when this host's request budget is used up
+            limiter.wait(url)
+
+            response = session.request(method, url, **kwargs)
+
+            # The limiter slows this host down and applies any Retry-After
+            # before the next attempt's wait()
+            if response.status_code == 429:
+                cooldown = limiter.record_throttle(url, response.headers.get('Retry-After'))
+                print(f"  [{prefix}Rate Limit] Backing off {cooldown:.0f}s...")
+                continue
+            elif response.status_code >= 500:
+                cooldown = limiter.record_throttle(url, response.headers.get('Retry-After'))
+                print(f"  [{prefix}Server Error] {response.status_code}. Retrying in {cooldown:.0f}s...")
+                continue
+
+            limiter.record_success(url)
+            return response
+        except requests.RequestException as e:
+            print(f"  [{prefix}Network Error] {e}")
+            if attempt < max_retries - 1:
+                time.sleep(2)
+    return None
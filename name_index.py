@@ -0,0 +1,114 @@
+import re
+import bisect
+from difflib import SequenceMatcher
+
+# Legal-form words that differ between sources ("Ltd" vs "Limited") and carry no identity
+NAME_SUFFIXES = {
+    "limited", "ltd", "pvt", "private", "inc", "incorporated", "corp", "corporation",
+    "co", "company", "plc", "llp", "the",
+}
+
+# A non-exact match is only trusted when it leads the runner-up by this much
+MATCH_MARGIN = 0.1
+
+def normalize_name(name):
+    """Lowercases a company name and drops punctuation and legal-form words."""
+    name = (name or "").lower().replace("&", " and ")
+    words = re.sub(r"[^a-z0-9 ]+", " ", name).split()
+    kept = [w for w in words if w not in NAME_SUFFIXES]
+    return " ".join(kept or words)
+
+class NameIndex:
+    """
+    In-memory lookup of company records by name, for offline name resolution.
+
+    Records are dicts with a name field plus key fields (e.g. an NSE symbol)
+    that match exactly. search() tries exact keys, exact normalized names,
+    name prefixes and finally fuzzy matches on shared words, and returns
+    records ranked by score (1.0 = exact).
+    """
+
+    def __init__(self, records, name_field="name", key_fields=("symbol",)):
+        self.records = list(records)
+        self.name_field = name_field
+        self._by_key = {}
+        self._by_name = {}
+        self._by_word = {}
+        for i, record in enumerate(self.records):
+            for field in key_fields:
+                if record.get(field):
+                    self._by_key.setdefault(str(record[field]).lower(), i)
+            norm = normalize_name(record.get(name_field))
+            if not norm:
+                continue
+            self._by_name.setdefault(norm, []).append(i)
+            for word in set(norm.split()):
+                self._by_word.setdefault(word, []).append(i)
+        self._sorted_names = sorted(self._by_name)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _prefixed(self, norm, limit):
+        start = bisect.bisect_left(self._sorted_names, norm)
+        names = []
+        for name in self._sorted_names[start:]:
+            if not name.startswith(norm) or len(names) >= limit:
+                break
+            # Whole-word prefixes only: "tata" matches "tata power", not "tatanagar"
+            if len(name) == len(norm) or name[len(norm)] == " ":
+                names.append(name)
+        return names
+
+    def search(self, query, limit=5, min_score=0.6):
+        """Returns up to limit records (copies with a 'score') best match first."""
+        norm = normalize_name(query)
+        scores = {}
+
+        def offer(i, score):
+            if score > scores.get(i, 0):
+                scores[i] = score
+
+        key = (query or "").strip().lower()
+        if key in self._by_key:
+            offer(self._by_key[key], 1.0)
+        for i in self._by_name.get(norm, []):
+            offer(i, 1.0)
+
+        if norm:
+            for name in self._prefixed(norm, limit=50):
+                # Shorter completions are closer to what was typed
+                for i in self._by_name[name]:
+                    offer(i, 0.75 + 0.2 * len(norm) / len(name))
+
+            # Fuzzy: only records sharing a word with the query are compared
+            candidates = set()
+            for word in norm.split():
+                candidates.update(self._by_word.get(word, []))
+            for i in candidates:
+                if i not in scores:
+                    ratio = SequenceMatcher(None, norm, normalize_name(self.records[i].get(self.name_field))).ratio()
+                    offer(i, 0.9 * ratio)
+
+        ranked = sorted(
+            (i for i, score in scores.items() if score >= min_score),
+            key=lambda i: (-scores[i], self.records[i].get(self.name_field) or "")
+        )
+        return [dict(self.records[i], score=round(scores[i], 3)) for i in ranked[:limit]]
+
+def confident_match(hits, min_score, margin=MATCH_MARGIN):
+    """
+    The best of search() hits when it is unambiguous, else None: an exact key
+    or name match (score 1.0) that no other hit ties, or a hit scoring at least
+    min_score that leads the runner-up by margin. "Tata" matches TATAPOWER,
+    TATASTEEL and TATAELXSI equally, so it is not confident.
+    """
+    if not hits:
+        return None
+    best = hits[0]
+    runner_up = hits[1]['score'] if len(hits) > 1 else 0
+    if best['score'] >= 1.0:
+        return best if runner_up < 1.0 else None
+    if best['score'] >= min_score and best['score'] - runner_up >= margin:
+        return best
+    return None
@@ -0,0 +1,107 @@
+import os
+import re
+import json
+import hashlib
+
+SIMHASH_BITS = 64
+# Fingerprints this many bits apart or fewer are the same story
+MAX_DISTANCE = 3
+# 64 bits in 4 bands of 16: two fingerprints within 3 bits agree on at least one band
+BANDS = 4
+# Fingerprints kept per company (oldest dropped first)
+MAX_ENTRIES = 5000
+
+def simhash(text):
+    """64-bit SimHash of text over word 3-shingles; near-identical texts get close hashes."""
+    words = re.findall(r"\w+", (text or "").lower())
+    shingles = [" ".join(words[i:i + 3]) for i in range(len(words) - 2)] or words
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def _bands(fingerprint):
+    width = SIMHASH_BITS // BANDS
+    mask = (1 << width) - 1
+    return [(band, fingerprint >> (band * width) & mask) for band in range(BANDS)]
+
+class NearDuplicateIndex:
+    """
+    Persistent SimHash fingerprints of one company's news, so the same wire
+    story syndicated under many URLs is kept once, across runs too.
+
+    Fingerprints are kept per kind ("snippet" for RSS title and snippet,
+    "body" for extracted text), since only texts of the same kind compare.
+    Lookups only compare fingerprints sharing a band with the query.
+    """
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = {"snippet": [], "body": []}
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries.update(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"  [Dedupe] Ignoring unreadable index {path}: {e}")
+        self._rebuild()
+
+    def _rebuild(self):
+        self._bands = {kind: {} for kind in self.entries}
+        for kind, entries in self.entries.items():
+            for i, (fingerprint, _) in enumerate(entries):
+                for band in _bands(fingerprint):
+                    self._bands[kind].setdefault(band, []).append(i)
+
+    def find(self, kind, fingerprint):
+        """URL of an earlier near-identical text of this kind, or None."""
+        entries = self.entries.setdefault(kind, [])
+        candidates = set()
+        for band in _bands(fingerprint):
+            candidates.update(self._bands.setdefault(kind, {}).get(band, []))
+        for i in sorted(candidates):
+            other, other_url = entries[i]
+            if hamming(fingerprint, other) <= MAX_DISTANCE:
+                return other_url
+        return None
+
+    def add(self, kind, fingerprint, url):
+        entries = self.entries.setdefault(kind, [])
+        entries.append([fingerprint, url])
+        for band in _bands(fingerprint):
+            self._bands.setdefault(kind, {}).setdefault(band, []).append(len(entries) - 1)
+
+    def check(self, kind, text, url):
+        """
+        Returns the URL of another article this text duplicates, or None after
+        recording it. An article matching its own earlier fingerprint (a re-run
+        on the same day) is not a duplicate.
+        """
+        fingerprint = simhash(text)
+        duplicate_of = self.find(kind, fingerprint)
+        if duplicate_of is None:
+            self.add(kind, fingerprint, url)
+        elif duplicate_of == url:
+            return None
+        return duplicate_of
+
+    def save(self):
+        if not self.path:
+            return
+        for kind in self.entries:
+            self.entries[kind] = self.entries[kind][-self.max_entries:]
+        self._rebuild()
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  [Dedupe] Could not save index: {e}")
@@ -1,141 +1,411 @@
-import requests
 import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
-from urllib.parse import quote
+from bs4 import Tag, NavigableString, CData
+from urllib.parse import quote, urlsplit, urlunsplit, parse_qsl, urlencode
 import os
+import re
 import json
+import asyncio
 from datetime import datetime
-import time
-import random
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import get_rate_limiter
+from http_client import get_session
+from article_cache import get_article_cache
+from html_parser import make_soup, html_to_text
+
+# Article extraction: fetches in flight overall and per publisher host, the
+# deadline for one fetch (seconds, after its rate-limit wait) and parse threads
+ARTICLE_CONCURRENCY = 16
+ARTICLE_DEFAULT_HOST_LIMIT = 2
+# Google News links all start on news.google.com before redirecting, so their
+# publisher host comes from the feed's <source url>; this cap is for links without one
+ARTICLE_HOST_LIMITS = {"news.google.com": 8}
+ARTICLE_DEADLINE = 20
+ARTICLE_PARSE_WORKERS = 4
+
+# RSS headline + snippet needs this many words to judge near-duplicates before extraction
+MIN_SNIPPET_WORDS = 8
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {"oc", "ocid", "fbclid", "gclid", "cmpid", "ref", "ved", "usg"}
+
+def canonical_url(url):
+    """
+    URL reduced to what identifies the article: lowercase host without www,
+    no fragment, no trailing slash and no tracking parameters (utm_*, ...).
+    """
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower() or "https", host, path, urlencode(sorted(query)), ""))
+
+def normalize_title(title):
+    """Lowercase title with punctuation and repeated spaces removed."""
+    return " ".join(re.sub(r"[^\w\s]", " ", (title or "").lower()).split())
+
+def story_title(title):
+    """Headline without the " - Publisher" suffix Google News appends."""
+    return re.sub(r"\s+-\s+[^-]+$", "", title or "").strip()
+
+def publisher_host(entry):
+    """Host whose per-host cap an entry's fetch counts against: its publisher when the feed names one."""
+    host = urlsplit(entry.get('source_url') or entry['url']).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+def snippet_text(entry):
+    """Headline plus RSS snippet, when the snippet is more than the headline repeated."""
+    title = story_title(entry['title'])
+    description = entry.get('description') or ""
+    # Google News snippets are usually just the headline and publisher again
+    if description.startswith(title):
+        return title
+    return f"{title} {description}"
+
+def dedupe_entries(entries):
+    """Drops entries whose canonical URL or normalized title was already seen, keeping order."""
+    seen_urls = set()
+    seen_titles = set()
+    unique = []
+    for entry in entries:
+        url_key = canonical_url(entry['url'])
+        title_key = normalize_title(entry['title'])
+        if url_key in seen_urls or (title_key and title_key in seen_titles):
+            continue
+        seen_urls.add(url_key)
+        if title_key:
+            seen_titles.add(title_key)
+        unique.append(entry)
+    return unique
+
+# Content blocks considered by best_content_block()
+BLOCK_TAGS = {"div", "article", "section", "main", "td"}
+# Descend into a child block while it keeps this share of its parent's plain text
+BLOCK_KEEP = 0.75
+# Blocks whose text is mostly link text are menus or link lists, not articles
+MAX_LINK_DENSITY = 0.5
+
+def _child_blocks(element):
+    """The nearest block elements below element (not those nested in other blocks)."""
+    found = []
+    stack = list(element.contents)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Tag):
+            if node.name in BLOCK_TAGS:
+                found.append(node)
+            else:
+                stack.extend(node.contents)
+    return found
+
+def best_content_block(soup):
+    """
+    The element most likely to hold the article body, or None.
+
+    One bottom-up pass (iterative, so deep nesting cannot hit the recursion
+    limit) totals each element's text and link text. Starting from the block
+    with the most non-link text, it then descends into the child block that
+    keeps most of that text, shedding wrappers that add sidebars and footers.
+    Linear in the size of the page.
+    """
+    elements = [soup] + [node for node in soup.descendants if isinstance(node, Tag)]
+    # id(element) -> [text chars, link text chars]
+    stats = {}
+    for element in reversed(elements):
+        chars = links = 0
+        for child in element.contents:
+            if isinstance(child, Tag):
+                child_chars, child_links = stats[id(child)]
+                chars += child_chars
+                links += child_links
+            elif type(child) in (NavigableString, CData):
+                chars += len(child.strip())
+        if element.name == 'a':
+            links = chars
+        stats[id(element)] = [chars, links]
+
+    def plain(element):
+        chars, links = stats[id(element)]
+        return chars - links
+
+    blocks = [e for e in elements if e.name in BLOCK_TAGS]
+    if not blocks:
+        return None
+    best = max(blocks, key=plain)
+    while True:
+        child = max(_child_blocks(best), key=plain, default=None)
+        if child is None or plain(child) < BLOCK_KEEP * plain(best):
+            break
+        best = child
+
+    chars, links = stats[id(best)]
+    if not chars or links / chars > MAX_LINK_DENSITY:
+        return None
+    return best
+
+def parse_article(html):
+    """
+    Main article text of an HTML page ("" if none). Pure CPU work with no
+    shared state, so it can run on a worker thread.
+    """
+    try:
+        soup = make_soup(html)
+        
+        # Clean pollution
+        for script in soup(["script", "style", "nav", "footer", "header", "noscript", "iframe"]):
+            script.decompose()
+        
+        # Strategy 1: Meta Description (High quality fallback)
+        meta_desc = ""
+        meta_tag = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
+        if meta_tag:
+            meta_desc = meta_tag.get("content", "").strip()
+
+        # Strategy 2: <article> or <p> tags
+        text_blocks = []
+        article = soup.find('article')
+        if article:
+            text_blocks = [p.get_text().strip() for p in article.find_all('p')]
+        else:
+            text_blocks = [p.get_text().strip() for p in soup.find_all('p')]
+        
+        # Filter empty or short lines
+        clean_blocks = [t for t in text_blocks if len(t) > 20]
+        full_text = " ".join(clean_blocks)
+        
+        # Strategy 3: Text Density (Fallback if <p> tags failed)
+        if len(full_text) < 200:
+            block = best_content_block(soup)
+            best_text = block.get_text(" ", strip=True) if block is not None else ""
+            if len(best_text) > len(full_text) and len(best_text) > 100:
+                full_text = best_text[:5000] # Cap length to avoid dumping huge garbage
+
+        # Return best result
+        return full_text if len(full_text) > 50 else meta_desc
+        
+    except Exception:
+        return ""
 
 class NewsScraper:
-    def __init__(self):
+    def __init__(self, article_cache=None):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.rate_limiter = get_rate_limiter()
+        self.session = get_session()
+        self.article_cache = article_cache or get_article_cache()
+        # Parsing runs off the event loop on threads kept for the scraper's
+        # lifetime. Worker processes would cost a spawn per batch and re-import
+        # the caller's __main__.
+        self._parse_pool = ThreadPoolExecutor(max_workers=ARTICLE_PARSE_WORKERS)
 
-    def _extract_text(self, url):
-        """
-        Visits the URL and attempts to extract main article text.
-        """
+    def _fetch_article(self, url, wait=True):
+        """Downloads an article page; returns (HTML, URL after redirects) or None."""
         try:
-            # Random delay to be polite
-            time.sleep(random.uniform(0.5, 1.5))
+            # Be polite to the publisher without a fixed sleep per article
+            if wait:
+                self.rate_limiter.wait(url)
             # Follow redirects is default, but ensure headers help avoid blocks
-            response = requests.get(url, headers=self.headers, timeout=15, allow_redirects=True)
-            
+            response = self.session.get(url, headers=self.headers, timeout=15, allow_redirects=True)
+
             # Check if we are stuck on a Google consent/redirect page
             if "consent.google.com" in response.url:
-                return "" # Can't bypass easily without browser
-                
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Clean pollution
-            for script in soup(["script", "style", "nav", "footer", "header", "noscript", "iframe"]):
-                script.decompose()
-            
-            # Strategy 1: Meta Description (High quality fallback)
-            meta_desc = ""
-            meta_tag = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
-            if meta_tag:
-                meta_desc = meta_tag.get("content", "").strip()
-
-            # Strategy 2: <article> or <p> tags
-            text_blocks = []
-            article = soup.find('article')
-            if article:
-                text_blocks = [p.get_text().strip() for p in article.find_all('p')]
-            else:
-                text_blocks = [p.get_text().strip() for p in soup.find_all('p')]
-            
-            # Filter empty or short lines
-            clean_blocks = [t for t in text_blocks if len(t) > 20]
-            full_text = " ".join(clean_blocks)
-            
-            # Strategy 3: Text Density (Fallback if <p> tags failed)
-            if len(full_text) < 200:
-                # Find the div with the most text
-                max_len = 0
-                best_text = ""
-                for div in soup.find_all('div'):
-                    # Get direct text or minimal nesting? 
-                    # Simplify: just get text
-                    t = div.get_text(" ", strip=True)
-                    if len(t) > max_len:
-                        max_len = len(t)
-                        best_text = t
-                
-                if len(best_text) > len(full_text) and len(best_text) > 100:
-                    full_text = best_text[:5000] # Cap length to avoid dumping huge garbage
+                return None # Can't bypass easily without browser
 
-            # Return best result
-            return full_text if len(full_text) > 50 else meta_desc
-            
+            response.raise_for_status()
+            return response.text, response.url
         except Exception as e:
             # print(f"    [Error] Content extract failed for {url}: {e}")
-            return ""
+            return None
 
-    def fetch_news(self, company, limit=5):
+    def _extract_text(self, url):
         """
-        Fetches news RSS and then scrapes FULL TEXT.
+        Visits the URL and attempts to extract main article text.
         """
-        print(f"\nFetching news and extracting FULL CONTENT for '{company}'...")
-        rss_url = f"https://news.google.com/rss/search?q={quote(company)}+when:1y&hl=en-IN&gl=IN&ceid=IN:en"
-        
+        fetched = self._fetch_article(url)
+        return parse_article(fetched[0]) if fetched else ""
+
+    async def _extract_one(self, url, host, limit, host_limits, fetch_pool, parse_pool):
+        host = host or urlsplit(url).netloc.lower()
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(ARTICLE_HOST_LIMITS.get(host, ARTICLE_DEFAULT_HOST_LIMIT))
+        loop = asyncio.get_running_loop()
+        async with limit, host_limits[host]:
+            # Waiting for the host's rate budget does not count against the deadline
+            await loop.run_in_executor(fetch_pool, self.rate_limiter.wait, url)
+            try:
+                fetched = await asyncio.wait_for(
+                    loop.run_in_executor(fetch_pool, self._fetch_article, url, False), ARTICLE_DEADLINE
+                )
+            except asyncio.TimeoutError:
+                return None
+        if not fetched:
+            return None
+        html, resolved_url = fetched
+        text = await loop.run_in_executor(parse_pool, parse_article, html)
+        return text, resolved_url
+
+    async def _extract_all(self, urls, hosts):
+        limit = asyncio.Semaphore(ARTICLE_CONCURRENCY)
+        host_limits = {}
+        # One thread per fetch in flight; a fetch past its deadline keeps its
+        # thread until the request timeout, so the pool is not waited on
+        fetch_pool = ThreadPoolExecutor(max_workers=ARTICLE_CONCURRENCY)
+        try:
+            return await asyncio.gather(*(
+                self._extract_one(url, host, limit, host_limits, fetch_pool, self._parse_pool)
+                for url, host in zip(urls, hosts)
+            ))
+        finally:
+            fetch_pool.shutdown(wait=False)
+
+    def extract_texts(self, urls, hosts=None):
+        """
+        Article text for many URLs at once ("" where extraction failed), in order.
+        hosts optionally names the publisher of each URL for the per-host cap
+        (a redirecting news.google.com link otherwise counts against Google).
+
+        Articles extracted on an earlier run come from the article cache without
+        any request. The rest are fetched concurrently under a global and a
+        per-host cap, each with its own deadline; HTML parsing runs on the
+        scraper's parse threads. Failed fetches and empty extractions are not cached, so they
+        are retried next run.
+        """
+        if not urls:
+            return []
+        keys = [canonical_url(url) for url in urls]
+        cached = self.article_cache.get_many(keys)
+        hosts = hosts or [None] * len(urls)
+        missing = [(url, host) for url, key, host in zip(urls, keys, hosts) if key not in cached]
+        if cached:
+            print(f"  {len(urls) - len(missing)} of {len(urls)} articles from cache")
+
+        fetched = {}
+        if missing:
+            missing_urls = [url for url, _ in missing]
+            results = asyncio.run(self._extract_all(missing_urls, [host for _, host in missing]))
+            fetched = dict(zip(missing_urls, results))
+        # Empty text (JS redirects, pages the block picker misreads) is not
+        # cached either, so those articles are tried again next run
+        self.article_cache.set_many({
+            canonical_url(url): (result[0], canonical_url(result[1]))
+            for url, result in fetched.items() if result is not None and result[0]
+        })
+
+        texts = []
+        for url, key in zip(urls, keys):
+            if key in cached:
+                texts.append(cached[key]["text"])
+            else:
+                texts.append(fetched[url][0] if fetched.get(url) else "")
+        return texts
+
+    def fetch_feed(self, query):
+        """
+        Fetches the Google News RSS results for query without visiting any article.
+        Returns entries: {title, url, published_at, description, search_query}.
+        """
+        rss_url = f"https://news.google.com/rss/search?q={quote(query)}+when:1y&hl=en-IN&gl=IN&ceid=IN:en"
         try:
-            response = requests.get(rss_url, headers=self.headers, timeout=15)
+            self.rate_limiter.wait(rss_url)
+            response = self.session.get(rss_url, headers=self.headers, timeout=15)
             response.raise_for_status()
-            
-            # Parse XML
             root = ET.fromstring(response.content)
-            items = root.findall('.//item')
-            
-            news_items = []
-            count = 0
-            for item in items:
-                if count >= limit: break
-                
-                title = item.find('title').text
-                link = item.find('link').text
-                pubDate = item.find('pubDate').text
-                
-                # Get description/snippet from RSS as fallback
-                description_tag = item.find('description')
-                description = ""
-                if description_tag is not None:
-                    # Description is usually HTML, strip tags
-                    d_text = description_tag.text or ""
-                    soup_d = BeautifulSoup(d_text, 'html.parser')
-                    description = soup_d.get_text().strip()
-                
-                print(f"  Processing: {title[:50]}...")
-                
-                # Extract full text
-                full_text = self._extract_text(link)
-                
-                final_content = full_text if full_text else description
-                
-                if final_content:
-                    news_items.append({
-                        "title": title,
-                        "content": final_content, # Real Data or Snippet
-                        "is_full_text": bool(full_text),
-                        "published_at": pubDate,
-                        "url": link,
-                        "scraped_at": datetime.now().isoformat()
-                    })
-                    count += 1
-                else:
-                    print(f"    -> Skipped (No content found)")
-                
-            return news_items
-
         except Exception as e:
-            print(f"Error fetching news: {e}")
+            print(f"Error fetching news feed for '{query}': {e}")
             return []
 
+        entries = []
+        for item in root.findall('.//item'):
+            title = item.findtext('title') or ""
+            link = item.findtext('link')
+            if not link:
+                continue
+            # Description is usually HTML, strip tags
+            d_text = item.findtext('description') or ""
+            description = html_to_text(d_text).strip()
+            source = item.find('source')
+            entries.append({
+                "title": title,
+                "url": link,
+                "published_at": item.findtext('pubDate'),
+                "description": description,
+                "search_query": query,
+                # Publisher site, e.g. https://www.livemint.com; the link itself is a Google redirect
+                "source_url": source.get('url') if source is not None else None,
+            })
+        return entries
+
+    def _build_item(self, entry, full_text):
+        """News item for an RSS entry and its article text, or None without content."""
+        print(f"  Processing: {entry['title'][:50]}...")
+        # RSS snippet as fallback
+        final_content = full_text if full_text else entry['description']
+        if not final_content:
+            print(f"    -> Skipped (No content found)")
+            return None
+        return {
+            "title": entry['title'],
+            "content": final_content, # Real Data or Snippet
+            "is_full_text": bool(full_text),
+            "published_at": entry['published_at'],
+            "url": entry['url'],
+            "search_query": entry['search_query'],
+            "scraped_at": datetime.now().isoformat()
+        }
+
+    def _collect(self, entries, limit, dedupe_index=None):
+        """
+        Builds items from entries in order until limit of them have content.
+        Articles are extracted concurrently, as many at a time as are still needed.
+
+        With a NearDuplicateIndex, copies of a story already collected (now or
+        on an earlier run) are dropped: before extraction when the RSS title
+        and snippet give them away, otherwise once their text is known. Dropped
+        copies do not count towards limit.
+        """
+        news_items = []
+        pending = list(entries)
+        dropped = 0
+        while pending and len(news_items) < limit:
+            batch, pending = pending[:limit - len(news_items)], pending[limit - len(news_items):]
+            if dedupe_index is not None:
+                unique = []
+                for entry in batch:
+                    snippet = snippet_text(entry)
+                    # Short headlines ("Tata Power Q2 results") recur for different stories
+                    if len(snippet.split()) >= MIN_SNIPPET_WORDS and \
+                            dedupe_index.check("snippet", snippet, canonical_url(entry['url'])):
+                        dropped += 1
+                    else:
+                        unique.append(entry)
+                batch = unique
+            texts = self.extract_texts([entry['url'] for entry in batch],
+                                       [publisher_host(entry) for entry in batch])
+            for entry, full_text in zip(batch, texts):
+                item = self._build_item(entry, full_text)
+                if item and dedupe_index is not None:
+                    body = f"{story_title(item['title'])} {item['content']}"
+                    if dedupe_index.check("body", body, canonical_url(item['url'])):
+                        print(f"    -> Skipped (Near-duplicate of an article already collected)")
+                        dropped += 1
+                        continue
+                if item:
+                    news_items.append(item)
+        if dropped:
+            print(f"  Dropped {dropped} near-duplicate articles")
+        return news_items
+
+    def fetch_news(self, company, limit=5):
+        """
+        Fetches news RSS and then scrapes FULL TEXT.
+        """
+        print(f"\nFetching news and extracting FULL CONTENT for '{company}'...")
+        entries = dedupe_entries(self.fetch_feed(company))
+        return self._collect(entries, limit)
+
     def fetch_reddit_posts(self, company, limit=50):
         """
         Fetches recent reddit posts about the company.
@@ -150,9 +420,9 @@ class NewsScraper:
         }
         
         try:
-            # Add delay to be respectful to Reddit
-            time.sleep(random.uniform(1.0, 2.0))
-            response = requests.get(url, headers=headers, timeout=10)
+            # Respect Reddit's request budget
+            self.rate_limiter.wait(url)
+            response = self.session.get(url, headers=headers, timeout=10)
             
             if response.status_code == 403:
                 print("  [Warning] Reddit blocked this request (403). This is likely due to Reddit's API restrictions. Skipping.")
@@ -190,9 +460,14 @@ class NewsScraper:
             print(f"Error fetching Reddit posts: {e}")
             return []
 
-    def fetch_massive_news(self, company, total_limit=50):
+    def fetch_massive_news(self, company, total_limit=50, dedupe_index=None):
         """
         Fetches news using multiple variations of keywords to build a massive dataset.
+
+        All feeds are read concurrently first; their entries are merged and
+        deduplicated by canonical URL and title, and only the unique ones are
+        visited for full text, until total_limit articles have content. A
+        NearDuplicateIndex also drops syndicated copies of the same story.
         """
         print(f"\n[Massive Mode] Fetching news for '{company}'...")
         
@@ -206,29 +481,21 @@ class NewsScraper:
             f"{company} projects",
             f"{company} growth"
         ]
-        
-        all_items = []
-        seen_urls = set()
-        
-        # Distribute limit, but at least 5 per query
-        limit_per_query = max(5, int(total_limit / len(queries)) + 2)
-        
-        for q in queries:
-            if len(all_items) >= total_limit: break
-            
-            # Re-use the existing RSS fetcher
-            # Note: fetch_news prints "Fetching news...", we might want to silence it or accept it
-            items = self.fetch_news(q, limit=limit_per_query)
-            
-            for item in items:
-                if item['content'] and item['url'] not in seen_urls:
-                    # Enrich with query info
-                    item['search_query'] = q
-                    all_items.append(item)
-                    seen_urls.add(item['url'])
-        
+
+        # RSS requests are cheap; the shared rate limiter keeps news.google.com in budget
+        with ThreadPoolExecutor(max_workers=len(queries)) as pool:
+            feeds = list(pool.map(self.fetch_feed, queries))
+
+        # Merge in query order so earlier, broader queries win ties
+        merged = [entry for feed in feeds for entry in feed]
+        entries = dedupe_entries(merged)
+        print(f"  [Massive Mode] {len(merged)} feed entries, {len(entries)} unique")
+
+        all_items = self._collect(entries, total_limit, dedupe_index)
+        if dedupe_index is not None:
+            dedupe_index.save()
         print(f"\n  [Massive Mode] Collected {len(all_items)} unique articles/snippets.")
-        return all_items[:total_limit]
+        return all_items
 
     def save_data(self, items, folder, filename_prefix):
         if not os.path.exists(folder):
@@ -1,10 +1,83 @@
 import requests
 import time
-import random
 import re
+import csv
+import io
 import json
 import os
+import threading
+from datetime import datetime, timedelta
 from urllib.parse import quote
+from rate_limiter import get_rate_limiter
+from http_client import new_session, request_with_retry
+from response_cache import get_response_cache
+from announcement_store import AnnouncementStore, parse_an_dt
+from name_index import NameIndex, confident_match
+from downloader import DownloadEngine
+
+# Session cookies shared by later runs and parallel workers
+COOKIE_CACHE = os.path.join("downloads", ".cache", "nse_cookies.json")
+# NSE sets some cookies without an expiry; trust those for this long
+SESSION_COOKIE_TTL = 2 * 60 * 60
+
+# NSE's equity master list (symbol, name, ISIN of every listed equity), kept
+# locally as a compact index so names resolve without the autocomplete API
+SYMBOL_MASTER_URL = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
+SYMBOL_INDEX = os.path.join("downloads", ".cache", "nse_symbols.json")
+SYMBOL_INDEX_MAX_AGE = 7 * 24 * 3600
+# Local matches scoring at least this are trusted without asking the API
+LOCAL_MATCH_SCORE = 0.8
+
+# Announcement text that marks a standalone BRSR filing
+BRSR_KEYWORDS = ['brsr', 'business responsibility', 'sustainability report', 'bsr']
+# Announcement fields that may carry the XBRL instance of a filing with hasXbrl.
+# NSE does not document them and no recorded payload has confirmed them, so a
+# filing with hasXbrl but none of these logs its keys (once per run).
+XBRL_URL_FIELDS = ['xbrlFile', 'attchmntXbrl', 'xbrl', 'xbrlUrl']
+
+def is_brsr_announcement(item):
+    desc = (item.get('desc') or '').lower()
+    text = (item.get('attchmntText') or '').lower()
+    return any(keyword in desc or keyword in text for keyword in BRSR_KEYWORDS)
+
+_xbrl_field_warned = False
+
+def _warn_missing_xbrl_field(item):
+    """Shows, once per run, the keys of a filing with hasXbrl but no known XBRL URL field."""
+    global _xbrl_field_warned
+    if _xbrl_field_warned:
+        return
+    _xbrl_field_warned = True
+    print(f"  [NSE] A filing with hasXbrl carries none of {XBRL_URL_FIELDS}, so its XBRL is not "
+          f"downloaded (shown once per run). Announcement keys: {sorted(item)}")
+
+def _parse_brsr_item(item):
+    """Turns a BRSR announcement into a report dict, or None if it has no attachment."""
+    file_url = item.get('attchmntFile')
+    if not file_url:
+        return None
+    date_str = item.get('an_dt', '')
+
+    # Extract year from date (format: "06-Sep-2025 17:31:24")
+    filed = parse_an_dt(date_str)
+    year = str(filed.year) if filed else None
+
+    xbrl_url = None
+    if item.get('hasXbrl'):
+        xbrl_url = next((item[f] for f in XBRL_URL_FIELDS
+                         if isinstance(item.get(f), str) and item[f].startswith('http')), None)
+        if xbrl_url is None:
+            _warn_missing_xbrl_field(item)
+
+    return {
+        "year": year or "Unknown",
+        "url": file_url,
+        "description": f"BRSR Report - {date_str}",
+        "size": item.get('fileSize', 'Unknown'),
+        "has_xbrl": item.get('hasXbrl', False),
+        "xbrl_url": xbrl_url,
+        "date": date_str
+    }
 
 class NSEClient:
     BASE_URL = "https://www.nseindia.com/"
@@ -22,53 +95,204 @@ class NSEClient:
         "Sec-Fetch-User": "?1",
         "Cache-Control": "max-age=0",
     }
+    # How long API answers stay fresh in the response cache (seconds).
+    # Filing lists change a few times a year; symbols almost never.
+    CACHE_TTLS = {
+        "search": 30 * 24 * 3600,
+        "annual_reports": 24 * 3600,
+        "announcements": 6 * 3600,
+        # Bulk sweep windows that ended before today no longer change
+        "sweep_archive": 30 * 24 * 3600,
+    }
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(self.HEADERS)
+    def __init__(self, cookie_cache=COOKIE_CACHE, cache=None, announcements=None, symbol_index=SYMBOL_INDEX):
+        self.session = new_session(self.HEADERS)
+        self.rate_limiter = get_rate_limiter()
+        self.cache = cache or get_response_cache()
+        self.announcements = announcements or AnnouncementStore()
+        self.cookie_cache = cookie_cache
+        self.symbol_index_path = symbol_index
+        self._symbol_index = None
+        self._index_lock = threading.Lock()
         self._initialized = False
+        self._session_lock = threading.Lock()
 
     def _request_with_retry(self, url, method="GET", headers=None, timeout=30, max_retries=3):
-        for attempt in range(max_retries):
-            try:
-                # Polite delay
-                time.sleep(random.uniform(1.0, 3.0))
-                
-                response = self.session.request(method, url, headers=headers, timeout=timeout)
-                
-                if response.status_code == 429:
-                    wait_time = (2 ** attempt) * 5
-                    print(f"  [NSE Rate Limit] Sleeping {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
-                elif response.status_code >= 500:
-                    print(f"  [NSE Server Error] {response.status_code}. Retrying...")
-                    time.sleep(2)
-                    continue
-                    
-                return response
-            except requests.RequestException as e:
-                print(f"  [NSE Network Error] {e}")
-                time.sleep(2)
-        
-        return None
+        return request_with_retry(
+            self.session, url, method=method, max_retries=max_retries, label="NSE",
+            headers=headers, timeout=timeout
+        )
+
+    def _load_cookies(self):
+        """Restores unexpired session cookies saved by an earlier run. Returns True on success."""
+        if not self.cookie_cache or not os.path.exists(self.cookie_cache):
+            return False
+        try:
+            with open(self.cookie_cache, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        now = time.time()
+        cookies = [c for c in saved.get('cookies', []) if c.get('expires') and c['expires'] > now]
+        if not cookies:
+            return False
+        for c in cookies:
+            self.session.cookies.set(c['name'], c['value'], domain=c.get('domain', ''), path=c.get('path', '/'))
+        return True
+
+    def _save_cookies(self):
+        if not self.cookie_cache:
+            return
+        now = time.time()
+        cookies = []
+        for c in self.session.cookies:
+            cookies.append({
+                "name": c.name,
+                "value": c.value,
+                "domain": c.domain,
+                "path": c.path,
+                "expires": c.expires or now + SESSION_COOKIE_TTL,
+            })
+        try:
+            os.makedirs(os.path.dirname(self.cookie_cache), exist_ok=True)
+            tmp_path = f"{self.cookie_cache}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"saved_at": now, "cookies": cookies}, f, indent=2)
+            os.replace(tmp_path, self.cookie_cache)
+        except OSError as e:
+            print(f"Could not save NSE cookies: {e}")
+
+    def _refresh_session(self):
+        print("Initializing NSE session...")
+        try:
+            # Visit homepage to set cookies
+            self.session.cookies.clear()
+            self.session.get(self.BASE_URL, timeout=30)
+            self._initialized = True
+            self._save_cookies()
+        except requests.RequestException as e:
+            print(f"Failed to initialize NSE session: {e}")
 
     def _ensure_session(self):
-        if not self._initialized:
-            print("Initializing NSE session...")
-            try:
-                # Visit homepage to set cookies
-                self.session.get(self.BASE_URL, timeout=30)
+        with self._session_lock:
+            if self._initialized:
+                return
+            if self._load_cookies():
+                print("Reusing cached NSE session cookies")
                 self._initialized = True
-            except requests.RequestException as e:
-                print(f"Failed to initialize NSE session: {e}")
+                return
+            self._refresh_session()
+
+    def _is_rejected(self, response):
+        """True when NSE refused the API call (expired cookies or a bot challenge page)."""
+        if response.status_code in (401, 403):
+            return True
+        ctype = response.headers.get('Content-Type', '').lower()
+        return response.status_code == 200 and 'text/html' in ctype
+
+    def _api_request(self, url, headers=None, timeout=30, cache_ttl=None):
+        """
+        Calls an NSE API endpoint, refreshing the session cookies once if the
+        cached ones are rejected. With cache_ttl, a stored answer younger than
+        that is returned without touching the network.
+        """
+        cached = self.cache.get(url, cache_ttl, headers)
+        if cached is not None:
+            return cached
+
+        self._ensure_session()
+        response = self._request_with_retry(url, headers=headers, timeout=timeout)
+        if response is not None and self._is_rejected(response):
+            print(f"  [NSE] Session rejected ({response.status_code}), refreshing cookies...")
+            with self._session_lock:
+                self._refresh_session()
+            response = self._request_with_retry(url, headers=headers, timeout=timeout)
+
+        if cache_ttl and response is not None and response.status_code == 200 and not self._is_rejected(response):
+            self.cache.set(url, response, headers)
+        return response
+
+    def refresh_symbol_index(self):
+        """
+        Downloads NSE's equity master list and saves it as the local symbol index.
+        Returns the records, or None if the download failed.
+        """
+        print("Refreshing local NSE symbol index...")
+        response = request_with_retry(self.session, SYMBOL_MASTER_URL, label="NSE", timeout=60)
+        if response is None or response.status_code != 200:
+            print(f"  Could not download the NSE symbol master ({getattr(response, 'status_code', 'no response')})")
+            return None
+
+        records = []
+        reader = csv.DictReader(io.StringIO(response.content.decode('utf-8-sig', errors='replace')))
+        for row in reader:
+            row = {k.strip().upper(): (v or '').strip() for k, v in row.items() if k}
+            if row.get('SYMBOL'):
+                records.append({
+                    "symbol": row['SYMBOL'],
+                    "name": row.get('NAME OF COMPANY', ''),
+                    "isin": row.get('ISIN NUMBER', ''),
+                })
+        if not records:
+            print("  NSE symbol master was empty or unreadable, keeping the old index")
+            return None
+
+        if self.symbol_index_path:
+            try:
+                os.makedirs(os.path.dirname(self.symbol_index_path) or ".", exist_ok=True)
+                tmp_path = f"{self.symbol_index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    # Rows instead of dicts keep the file compact
+                    json.dump({
+                        "fetched_at": time.time(),
+                        "fields": ["symbol", "name", "isin"],
+                        "rows": [[r['symbol'], r['name'], r['isin']] for r in records],
+                    }, f)
+                os.replace(tmp_path, self.symbol_index_path)
+            except OSError as e:
+                print(f"  Could not save NSE symbol index: {e}")
+        print(f"  Indexed {len(records)} NSE equities")
+        return records
+
+    def _read_symbol_index(self):
+        """Returns (records, fetched_at) from the local index file, or (None, 0)."""
+        if not self.symbol_index_path or not os.path.exists(self.symbol_index_path):
+            return None, 0
+        try:
+            with open(self.symbol_index_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            fields = saved['fields']
+            return [dict(zip(fields, row)) for row in saved['rows']], saved.get('fetched_at', 0)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"  Ignoring unreadable NSE symbol index: {e}")
+            return None, 0
+
+    def symbol_index(self):
+        """The in-memory NameIndex over NSE equities, refreshed from NSE when older than a week."""
+        with self._index_lock:
+            if self._symbol_index is None:
+                records, fetched_at = self._read_symbol_index()
+                if self.symbol_index_path and (records is None or time.time() - fetched_at > SYMBOL_INDEX_MAX_AGE):
+                    # A stale index still beats none if the refresh fails
+                    records = self.refresh_symbol_index() or records
+                self._symbol_index = NameIndex(records or [], key_fields=("symbol", "isin"))
+            return self._symbol_index
 
     def search_company(self, query):
         """
         Search for a company symbol on NSE.
         Returns list of {'symbol': 'RELIANCE', 'name': 'Reliance Industries Limited'}
+
+        Names are resolved against the local symbol index first; the
+        autocomplete API is only asked when no local match is exact or clearly
+        ahead of the others (see name_index.confident_match).
         """
-        self._ensure_session()
+        local = self.symbol_index().search(query)
+        if confident_match(local, LOCAL_MATCH_SCORE):
+            print(f"Resolved '{query}' from local NSE symbol index: {local[0]['symbol']}")
+            return local
+
         search_url = f"https://www.nseindia.com/api/search/autocomplete?q={quote(query)}"
         
         # API requires slightly cleaner headers (no navigate mode)
@@ -84,7 +308,8 @@ class NSEClient:
         try:
             print(f"Searching NSE for '{query}'...")
             # response = self.session.get(search_url, headers=api_headers, timeout=10)
-            response = self._request_with_retry(search_url, headers=api_headers, timeout=15)
+            response = self._api_request(search_url, headers=api_headers, timeout=15,
+                                         cache_ttl=self.CACHE_TTLS["search"])
             
             if response and response.status_code == 200:
                 try:
@@ -113,7 +338,6 @@ class NSEClient:
         Note: NSE might not have a simple 'all annual reports' API open publically.
         We will try the 'corporate-filings' API.
         """
-        self._ensure_session()
         
         # Endpoint structure based on exploration/common knowledge of NSE Hidden APIs
         # Try to fetch from corporate filings 
@@ -142,7 +366,8 @@ class NSEClient:
         try:
             print(f"Fetching annual reports for {symbol}...")
             # response = self.session.get(api_url, headers=api_headers, timeout=15)
-            response = self._request_with_retry(api_url, headers=api_headers, timeout=20)
+            response = self._api_request(api_url, headers=api_headers, timeout=20,
+                                         cache_ttl=self.CACHE_TTLS["annual_reports"])
             
             reports = []
             if response and response.status_code == 200:
@@ -182,7 +407,7 @@ class NSEClient:
             print(f"Error fetching NSE reports: {e}")
             return []
 
-    def get_brsr_reports(self, symbol):
+    def get_brsr_reports(self, symbol, full_sync=False):
         """
         Get standalone BRSR (Business Responsibility and Sustainability Reports) for a specific symbol.
         
@@ -194,9 +419,18 @@ class NSEClient:
         - Text contains: "BUSINESS RESPONSIBILITY" or "BRSR"
         
         These are separate from embedded BRSR sections in Annual Reports.
+
+        Syncs are incremental: matching announcements are kept in the local
+        announcement store and only filings newer than the symbol's watermark
+        are requested. Pass full_sync=True to re-read the whole history.
         """
-        self._ensure_session()
+        watermark = None if full_sync else self.announcements.watermark(symbol)
         api_url = f"https://www.nseindia.com/api/corporate-announcements?index=equities&symbol={quote(symbol)}"
+        if watermark:
+            # Re-read the watermark day itself; anything already stored is skipped on merge
+            from_date = watermark.strftime("%d-%m-%Y")
+            to_date = datetime.now().strftime("%d-%m-%Y")
+            api_url += f"&from_date={from_date}&to_date={to_date}"
         
         api_headers = {
             "Accept": "*/*",
@@ -205,53 +439,47 @@ class NSEClient:
         }
 
         try:
-            print(f"Fetching standalone BRSR reports for {symbol}...")
-            response = self._request_with_retry(api_url, headers=api_headers, timeout=20)
-            
-            reports = []
-            if response and response.status_code == 200:
-                data = response.json()
-                
-                # Filter for BRSR-related announcements
-                brsr_keywords = ['brsr', 'business responsibility', 'sustainability report', 'bsr']
-                
-                for item in data:
-                    desc = item.get('desc', '').lower()
-                    text = item.get('attchmntText', '').lower()
-                    
-                    # Check if this is a BRSR filing
-                    if any(keyword in desc or keyword in text for keyword in brsr_keywords):
-                        file_url = item.get('attchmntFile')
-                        date_str = item.get('an_dt', '')
-                        file_size = item.get('fileSize', 'Unknown')
-                        has_xbrl = item.get('hasXbrl', False)
-                        
-                        if file_url:
-                            # Extract year from date (format: "06-Sep-2025 17:31:24")
-                            year = None
-                            if date_str:
-                                try:
-                                    # Extract year from date string
-                                    parts = date_str.split('-')
-                                    if len(parts) >= 3:
-                                        year = parts[2].split()[0]  # "2025 17:31:24" -> "2025"
-                                except:
-                                    pass
-                            
-                            report_info = {
-                                "year": year or "Unknown",
-                                "url": file_url,
-                                "description": f"BRSR Report - {date_str}",
-                                "size": file_size,
-                                "has_xbrl": has_xbrl,
-                                "date": date_str
-                            }
-                            reports.append(report_info)
+            if watermark is not None and self._covered_by_sweep(watermark):
+                # A recent bulk sweep already merged everything filed since the watermark
+                print(f"Using swept BRSR filings for {symbol} (bulk sweep is up to date)")
+            else:
+                if watermark:
+                    print(f"Fetching standalone BRSR reports for {symbol} filed since {watermark:%d-%b-%Y}...")
+                else:
+                    print(f"Fetching standalone BRSR reports for {symbol}...")
+                response = self._api_request(api_url, headers=api_headers, timeout=20,
+                                             cache_ttl=self.CACHE_TTLS["announcements"])
+
+                if response and response.status_code == 200:
+                    data = response.json()
+                    if isinstance(data, dict):
+                        data = data.get('data', [])
+
+                    # Only filings after the watermark are new, in case the API ignored the date range
+                    new_items = []
+                    newest = watermark
+                    for item in data:
+                        filed = parse_an_dt(item.get('an_dt'))
+                        if watermark and filed and filed <= watermark:
+                            continue
+                        if filed and (newest is None or filed > newest):
+                            newest = filed
+                        if is_brsr_announcement(item):
+                            new_items.append(item)
+
+                    added = self.announcements.merge(symbol, new_items, newest)
+                    print(f"  {len(data)} announcements checked, {len(added)} new BRSR filings")
+                else:
+                    status = response.status_code if response is not None else "no response"
+                    print(f"  NSE Announcements API returned status: {status}. Using stored filings.")
+
+            reports = [r for r in (_parse_brsr_item(item) for item in
+                                   self.announcements.load(symbol)["announcements"]) if r]
                             
             if reports:
                 print(f"  Found {len(reports)} standalone BRSR reports")
-                # Sort by date (most recent first)
-                reports.sort(key=lambda x: x.get('date', ''), reverse=True)
+                # Sort by filing time (most recent first)
+                reports.sort(key=lambda x: parse_an_dt(x.get('date')) or datetime.min, reverse=True)
             else:
                 print(f"  No standalone BRSR reports found. Company may file BRSR embedded in Annual Reports.")
             
@@ -261,20 +489,98 @@ class NSEClient:
             print(f"Error fetching standalone BRSR reports: {e}")
             return []
 
+    def _covered_by_sweep(self, watermark):
+        """True when bulk sweeps cover everything filed since watermark and ran recently."""
+        coverage = self.announcements.sweep_coverage()
+        if not coverage:
+            return False
+        start, end = coverage
+        return start <= watermark and (datetime.now() - end).total_seconds() < self.CACHE_TTLS["announcements"]
+
+    def sweep_brsr_announcements(self, from_date, to_date=None, window_days=7):
+        """
+        Bulk mode: pulls corporate announcements for all equities between
+        from_date and to_date (dates), window_days at a time, and keeps the
+        BRSR filings. Matches are merged into each symbol's announcement store.
+        Returns {symbol: [report dicts]} for the filings that were new.
+        """
+        today = datetime.now().date()
+        to_date = min(to_date or today, today)
+        api_headers = {
+            "Accept": "*/*",
+            "Referer": "https://www.nseindia.com/companies-listing/corporate-filings-announcements",
+            "X-Requested-With": "XMLHttpRequest"
+        }
+
+        found = {}
+        complete = True
+        window_start = from_date
+        while window_start <= to_date:
+            window_end = min(to_date, window_start + timedelta(days=window_days - 1))
+            api_url = (f"https://www.nseindia.com/api/corporate-announcements?index=equities"
+                       f"&from_date={window_start:%d-%m-%Y}&to_date={window_end:%d-%m-%Y}")
+            ttl = self.CACHE_TTLS["announcements"] if window_end >= today else self.CACHE_TTLS["sweep_archive"]
+
+            print(f"Sweeping NSE announcements {window_start:%d-%b-%Y} to {window_end:%d-%b-%Y}...")
+            data = None
+            response = self._api_request(api_url, headers=api_headers, timeout=60, cache_ttl=ttl)
+            if response and response.status_code == 200:
+                try:
+                    data = response.json()
+                except ValueError:
+                    pass
+            if data is None:
+                status = response.status_code if response is not None else "no response"
+                print(f"  Sweep window failed ({status}); per-symbol syncs will fill the gap")
+                complete = False
+            else:
+                if isinstance(data, dict):
+                    data = data.get('data', [])
+                matches = [item for item in data if item.get('symbol') and is_brsr_announcement(item)]
+                print(f"  {len(data)} announcements, {len(matches)} BRSR filings")
+                for item in matches:
+                    found.setdefault(item['symbol'].upper(), []).append(item)
+            window_start = window_end + timedelta(days=1)
+
+        start = datetime.combine(from_date, datetime.min.time())
+        end = min(datetime.now(), datetime.combine(to_date, datetime.max.time()))
+        new_reports = {}
+        for symbol, items in found.items():
+            # A symbol's watermark only moves if the sweep leaves no gap after it
+            watermark = self.announcements.watermark(symbol)
+            seen_until = end if complete and watermark and start <= watermark else None
+            added = self.announcements.merge(symbol, items, seen_until)
+            reports = [r for r in (_parse_brsr_item(item) for item in added) if r]
+            if reports:
+                new_reports[symbol] = reports
+
+        if complete:
+            self.announcements.record_sweep(start, end)
+        print(f"Sweep found {sum(len(r) for r in new_reports.values())} new BRSR filings "
+              f"across {len(new_reports)} companies")
+        return new_reports
 
 class NSEScraper:
-    def __init__(self, data_dir):
-        self.client = NSEClient()
+    def __init__(self, data_dir, client=None):
+        # Pass a client to share its (cached) NSE session between scrapers
+        self.client = client or NSEClient()
         self.data_dir = data_dir
+        self._symbols = {}
+
+    def _resolve_symbol(self, company_name):
+        """Looks up the NSE symbol once per company, however many report types are fetched."""
+        if company_name not in self._symbols:
+            results = self.client.search_company(company_name)
+            self._symbols[company_name] = results[0]['symbol'] if results else None
+        return self._symbols[company_name]
 
     def search_and_download_reports(self, company_name, limit=3):
         try:
-            results = self.client.search_company(company_name)
-            if not results:
+            symbol = self._resolve_symbol(company_name)
+            if not symbol:
                 print(f"No NSE symbol found for {company_name}")
                 return
             
-            symbol = results[0]['symbol']
             print(f"Found NSE Symbol: {symbol}")
             
             reports = self.client.get_annual_reports(symbol)
@@ -288,11 +594,10 @@ class NSEScraper:
 
     def search_and_download_brsr(self, company_name, limit=3):
         try:
-            results = self.client.search_company(company_name)
-            if not results:
+            symbol = self._resolve_symbol(company_name)
+            if not symbol:
                 return
             
-            symbol = results[0]['symbol']
             reports = self.client.get_brsr_reports(symbol)
             
             reports.sort(key=lambda x: x['year'], reverse=True)
@@ -303,52 +608,9 @@ class NSEScraper:
             print(f"NSEScraper BRSR Error: {e}")
 
     def _download_files(self, reports, symbol, prefix):
-        # We can re-use the robust download_file from scraper.py if we import it, 
-        # or implement similar logic here. Since scraper.py imports THIS file, 
-        # importing scraper.py here would cause circular import.
-        # So we duplicate the robust logic or move it to a utils file.
-        # For safety in this session, I'll inline the robust logic here slightly simplified.
-        
+        """Downloads reports through the shared DownloadEngine, with the NSE session headers."""
+        engine = DownloadEngine()
         for report in reports:
-            year = report['year']
-            url = report['url']
-            filename = f"{symbol}_{prefix}_{year}.pdf"
-            filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-            filepath = os.path.join(self.data_dir, filename)
-
-            if os.path.exists(filepath):
-                print(f"Skipping {filename}, already exists.")
-                continue
-            
-            print(f"Downloading {filename} from {url}...")
-            max_retries = 5
-            for attempt in range(max_retries):
-                try:
-                    time.sleep(random.uniform(1.0, 3.0))
-                    
-                    r = self.client.session.get(url, stream=True, timeout=60)
-                    
-                    if r.status_code == 429:
-                        wait_time = (2 ** attempt) * 5
-                        print(f"  [Rate Limit] Sleeping {wait_time}s...")
-                        time.sleep(wait_time)
-                        continue
-                        
-                    if r.status_code == 200:
-                        with open(filepath, 'wb') as f:
-                            for chunk in r.iter_content(chunk_size=8192):
-                                f.write(chunk)
-                        print(f"Downloaded {filepath}")
-                        break # Success
-                    else:
-                        print(f"Failed to download {url}, Status: {r.status_code}")
-                        if r.status_code >= 500:
-                            time.sleep(2)
-                            continue
-                        break # Non-retryable error
-                        
-                except Exception as e:
-                    print(f"Download error {url}: {e}")
-                    time.sleep(2)
-            else:
-                print(f"Failed to download {filename} after retries.")
+            filename = re.sub(r'[<>:"/\\|?*]', '', f"{symbol}_{prefix}_{report['year']}.pdf")
+            engine.add(report['url'], self.data_dir, filename, headers=self.client.session.headers)
+        return engine.run()
@@ -4,7 +4,13 @@ import argparse
 import requests
 import time
 import logging
+import shutil
+import hashlib
+import queue
+import threading
 from pdf_utils import extract_text_from_pdf
+from artifact_store import ArtifactStore, hash_file
+from xbrl_parser import parse_xbrl, answers_from_xbrl
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -87,8 +93,12 @@ INSTRUCTIONS:
 ANSWER:"""
         return self.call_llm(prompt)
 
-    def traverse_and_answer(self, node, pages_text):
-        """Recursively walk the questions JSON"""
+    def traverse_and_answer(self, node, pages_text, xbrl_answers=None):
+        """
+        Recursively walk the questions JSON.
+        Questions answered by the filing's XBRL (xbrl_answers) skip the LLM.
+        """
+        xbrl_answers = xbrl_answers or {}
         if isinstance(node, dict):
             for k, v in node.items():
                 if isinstance(v, list) and len(v) > 0:
@@ -96,6 +106,9 @@ ANSWER:"""
                     if isinstance(v[0], str):
                         answered = []
                         for q in v:
+                            if q in xbrl_answers:
+                                answered.append({"question": q, "answer": xbrl_answers[q], "source": "xbrl"})
+                                continue
                             logger.info(f"Answering: {q[:50]}...")
                             context = self.find_relevant_context(q, pages_text)
                             if not context:
@@ -109,20 +122,87 @@ ANSWER:"""
                     elif isinstance(v[0], dict) and "question_text" in v[0]:
                          for item in v:
                              q = item["question_text"]
-                             logger.info(f"Answering: {q[:50]}...")
-                             context = self.find_relevant_context(q, pages_text)
-                             ans = self.ask_llm(q, context)
-                             item["answer"] = ans
+                             if q in xbrl_answers:
+                                 item["answer"] = xbrl_answers[q]
+                                 item["source"] = "xbrl"
+                             else:
+                                 logger.info(f"Answering: {q[:50]}...")
+                                 context = self.find_relevant_context(q, pages_text)
+                                 ans = self.ask_llm(q, context)
+                                 item["answer"] = ans
                              # Recurse if sub-questions exist
                              if "sub_questions" in item:
-                                 self.traverse_and_answer(item["sub_questions"], pages_text)
+                                 self.traverse_and_answer(item["sub_questions"], pages_text, xbrl_answers)
                     else:
-                        self.traverse_and_answer(v, pages_text)
+                        self.traverse_and_answer(v, pages_text, xbrl_answers)
                 else:
-                    self.traverse_and_answer(v, pages_text)
+                    self.traverse_and_answer(v, pages_text, xbrl_answers)
         elif isinstance(node, list):
             for item in node:
-                self.traverse_and_answer(item, pages_text)
+                self.traverse_and_answer(item, pages_text, xbrl_answers)
+
+    def load_xbrl_answers(self, pdf_path):
+        """
+        Answers from the XBRL instance filed with a report (same name, .xml),
+        or an empty dict when there is none.
+        """
+        xbrl_path = os.path.splitext(pdf_path)[0] + ".xml"
+        if not os.path.exists(xbrl_path):
+            return {}
+        answers = answers_from_xbrl(parse_xbrl(xbrl_path))
+        logger.info(f"XBRL answers {len(answers)} questions for {os.path.basename(pdf_path)}")
+        return answers
+
+    def process_pdf(self, pdf_path, store=None, seen_hashes=None):
+        """
+        Answers the questions for one report and saves <name>_BRSR_Extracted.json
+        next to it. Returns the output path, or None when the report was skipped.
+        """
+        fname = os.path.basename(pdf_path)
+        logger.info(f"Processing Report: {fname}")
+        out_path = os.path.splitext(pdf_path)[0] + "_BRSR_Extracted.json"
+        store = store or ArtifactStore()
+
+        # Identical documents (same report from two sources, or linked from
+        # another company folder) are only analyzed once. The XBRL filing next
+        # to a report changes its answers, so it is part of the key
+        digest = hash_file(pdf_path)
+        xbrl_path = os.path.splitext(pdf_path)[0] + ".xml"
+        if os.path.exists(xbrl_path):
+            digest = hashlib.sha256(f"{digest}+{hash_file(xbrl_path)}".encode('utf-8')).hexdigest()
+        if seen_hashes is not None:
+            if digest in seen_hashes:
+                logger.info(f"Skipping {fname}: identical to a report already processed")
+                return None
+            seen_hashes.add(digest)
+
+        cached_result = store.result_path(digest)
+        if os.path.exists(cached_result):
+            shutil.copyfile(cached_result, out_path)
+            logger.info(f"Reused earlier extraction for identical content: {out_path}\n")
+            return out_path
+
+        # 1. Extract Text (and structured facts, if an XBRL filing sits next to the PDF)
+        xbrl_answers = self.load_xbrl_answers(pdf_path)
+        pages_text = extract_text_from_pdf(pdf_path)
+        if not pages_text and not xbrl_answers:
+            logger.warning(f"No text extracted from {fname}")
+            return None
+
+        # 2. Clone Template
+        report_data = json.loads(json.dumps(self.questions)) # Deep copy
+
+        # 3. Answer Questions
+        logger.info(f"Analyzing {len(pages_text)} pages with LLM...")
+        self.traverse_and_answer(report_data, pages_text, xbrl_answers)
+
+        # 4. Save Result
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(report_data, f, indent=4)
+        os.makedirs(os.path.dirname(cached_result), exist_ok=True)
+        shutil.copyfile(out_path, cached_result)
+        logger.info(f"Saved extraction to {out_path}\n")
+        return out_path
 
     def process_company(self, company_name):
         company_dir = os.path.join(DOWNLOADS_DIR, company_name)
@@ -139,29 +219,68 @@ ANSWER:"""
         
         logger.info(f"Found {len(pdf_files)} PDF report(s) to process")
 
+        store = ArtifactStore()
+        seen_hashes = set()
+
         for fname in pdf_files:
-            logger.info(f"Processing Report: {fname}")
-            pdf_path = os.path.join(company_dir, fname)
-            
-            # 1. Extract Text
-            pages_text = extract_text_from_pdf(pdf_path)
-            if not pages_text:
-                logger.warning(f"No text extracted from {fname}")
-                continue
-
-            # 2. Clone Template
-            report_data = json.loads(json.dumps(self.questions)) # Deep copy
-
-            # 3. Answer Questions
-            logger.info(f"Analyzing {len(pages_text)} pages with LLM...")
-            self.traverse_and_answer(report_data, pages_text)
-
-            # 4. Save Result
-            out_name = fname.replace(".pdf", "_BRSR_Extracted.json")
-            out_path = os.path.join(company_dir, out_name)
-            with open(out_path, 'w', encoding='utf-8') as f:
-                json.dump(report_data, f, indent=4)
-            logger.info(f"Saved extraction to {out_path}\n")
+            self.process_pdf(os.path.join(company_dir, fname), store, seen_hashes)
+
+class AnalysisQueue:
+    """
+    Analyzes reports while the rest of the pipeline is still downloading.
+
+    Producers submit() validated PDFs as they finish; a consumer thread runs
+    BRSRAnalyzer.process_pdf on each in arrival order. The queue is bounded,
+    so producers wait instead of piling up reports faster than the LLM
+    answers them. close() waits for everything submitted.
+    """
+
+    def __init__(self, analyzer, maxsize=8, store=None):
+        self.analyzer = analyzer
+        self.store = store or ArtifactStore()
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.results = []
+        self.errors = []
+        self._submitted = set()
+        self._seen_hashes = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._consume, name="brsr-analysis", daemon=True)
+        self._thread.start()
+
+    def __len__(self):
+        """Number of reports submitted so far."""
+        return len(self._submitted)
+
+    def submit(self, pdf_path):
+        """Queues a report once; blocks while the queue is full."""
+        key = os.path.abspath(pdf_path)
+        with self._lock:
+            if key in self._submitted:
+                return False
+            self._submitted.add(key)
+        self.queue.put(pdf_path)
+        return True
+
+    def _consume(self):
+        while True:
+            pdf_path = self.queue.get()
+            try:
+                if pdf_path is None:
+                    return
+                out_path = self.analyzer.process_pdf(pdf_path, self.store, self._seen_hashes)
+                if out_path:
+                    self.results.append(out_path)
+            except Exception as e:
+                logger.error(f"Analysis of {pdf_path} failed: {e}")
+                self.errors.append((pdf_path, str(e)))
+            finally:
+                self.queue.task_done()
+
+    def close(self):
+        """Waits for every submitted report and stops the consumer. Returns the output paths."""
+        self.queue.put(None)
+        self._thread.join()
+        return self.results
 
 def main():
     parser = argparse.ArgumentParser(description="Process Annual Reports with Modal LLM")
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import atexit
+import threading
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+# Requests per second and burst size per host. Hosts not listed use DEFAULT_RATE.
+# Override at runtime with configure() or the SCRAPER_RATE_LIMITS environment
+# variable, e.g. "www.nseindia.com=0.5:2,news.google.com=4:8".
+DEFAULT_RATE = (1.0, 3)
+HOST_RATES = {
+    "www.nseindia.com": (0.5, 2),
+    "nsearchives.nseindia.com": (1.0, 3),
+    "www.annualreports.com": (0.5, 2),
+    "annualreports.com": (0.5, 2),
+    "news.google.com": (2.0, 5),
+    "www.reddit.com": (0.5, 1),
+    "html.duckduckgo.com": (0.5, 1),
+}
+
+# AIMD tuning: each success adds RATE_INCREASE req/s, each 429/5xx multiplies
+# the rate by RATE_DECREASE. Learned rates stay within [MIN_RATE, MAX_RATE_FACTOR x configured].
+RATE_INCREASE = 0.05
+RATE_DECREASE = 0.5
+MIN_RATE = 0.05
+MAX_RATE_FACTOR = 4.0
+
+# Learned per-host rates survive between runs so batch jobs start near the best known rate
+STATE_FILE = os.path.join("downloads", ".cache", "rate_limits.json")
+
+def parse_retry_after(value):
+    """Converts a Retry-After header (seconds or HTTP date) to seconds, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    now = datetime.now(when.tzinfo) if when.tzinfo else datetime.utcnow()
+    return max(0.0, (when - now).total_seconds())
+
+class TokenBucket:
+    """
+    Classic token bucket. Tokens refill at `rate` per second up to `burst`;
+    each request takes one token and only waits when the bucket is empty.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self):
+        """Takes a token and returns how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Tokens may go negative so concurrent callers queue up in order
+            self.tokens -= 1
+            delay = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+            # While blocked the bucket does not refill, so the two waits add up
+            return delay + max(0.0, self.blocked_until - now)
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+
+    def penalize(self, cooldown=None):
+        """
+        Drops any saved-up burst and, if given, blocks the bucket for `cooldown`
+        seconds. The first request after the cooldown goes straight through.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if cooldown:
+                self.tokens = min(self.tokens, 1.0)
+                # Refill resumes once the cooldown is over
+                self.blocked_until = max(self.blocked_until, now + cooldown)
+                self.updated = max(self.updated, self.blocked_until)
+            else:
+                self.tokens = min(self.tokens, 0.0)
+
+class RateLimiter:
+    """
+    Process-wide registry of token buckets keyed by host.
+
+    Rates adapt per host (AIMD): successes raise the allowed rate a little,
+    429s and 5xx halve it, and a Retry-After header blocks the host for as long
+    as the server asks. With a state_file the learned rates are saved and
+    reloaded by the next run.
+    """
+
+    def __init__(self, host_rates=None, default_rate=DEFAULT_RATE, state_file=None):
+        self.host_rates = dict(HOST_RATES if host_rates is None else host_rates)
+        self.default_rate = default_rate
+        self.state_file = state_file
+        self.learned_rates = self._load_state()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    def _load_state(self):
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    return {host: float(info["rate"]) for host, info in json.load(f).items()}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"  [Rate Limiter] Ignoring unreadable state {self.state_file}: {e}")
+        return {}
+
+    def save_state(self):
+        """Writes learned per-host rates to the state file."""
+        if not self.state_file:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            state = {
+                host: {"rate": round(bucket.rate, 4), "updated": datetime.now().isoformat()}
+                for host, bucket in self._buckets.items()
+            }
+            for host, rate in self.learned_rates.items():
+                state.setdefault(host, {"rate": rate})
+            # Written under the lock so concurrent saves cannot land out of order;
+            # the temp name is unique per process and thread in case of other writers
+            try:
+                os.makedirs(os.path.dirname(self.state_file) or ".", exist_ok=True)
+                tmp_path = f"{self.state_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.state_file)
+                self._dirty = False
+            except OSError as e:
+                print(f"  [Rate Limiter] Could not save state: {e}")
+
+    def _limits(self, host):
+        rate, burst = self.host_rates.get(host, self.default_rate)
+        return rate * MAX_RATE_FACTOR, burst
+
+    def configure(self, host, rate, burst):
+        """Sets requests/second and burst for a host, replacing its current bucket."""
+        host = host.lower()
+        with self._lock:
+            self.host_rates[host] = (rate, burst)
+            self.learned_rates.pop(host, None)
+            self._buckets.pop(host, None)
+
+    def bucket(self, host):
+        host = host.lower()
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.host_rates.get(host, self.default_rate)
+                max_rate, _ = self._limits(host)
+                learned = self.learned_rates.get(host)
+                if learned:
+                    rate = min(max_rate, max(MIN_RATE, learned))
+                self._buckets[host] = TokenBucket(rate, burst)
+            return self._buckets[host]
+
+    def record_success(self, url):
+        """Additive increase after a successful response."""
+        host = urlparse(url).netloc.lower()
+        bucket = self.bucket(host)
+        max_rate, _ = self._limits(host)
+        if bucket.rate < max_rate:
+            bucket.set_rate(min(max_rate, bucket.rate + RATE_INCREASE))
+            self._dirty = True
+
+    def record_throttle(self, url, retry_after=None):
+        """
+        Multiplicative decrease after a 429/5xx. Returns the seconds the host is
+        now blocked for (the server's Retry-After, or one token at the new rate).
+        """
+        host = urlparse(url).netloc.lower()
+        bucket = self.bucket(host)
+        new_rate = max(MIN_RATE, bucket.rate * RATE_DECREASE)
+        bucket.set_rate(new_rate)
+        cooldown = parse_retry_after(retry_after)
+        if cooldown is None:
+            cooldown = 1.0 / new_rate
+        bucket.penalize(cooldown)
+        self._dirty = True
+        self.save_state()
+        return cooldown
+
+    def wait(self, url):
+        """Blocks until the host of `url` has budget for one more request."""
+        host = urlparse(url).netloc
+        delay = self.bucket(host).reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+def _rates_from_env(value):
+    rates = {}
+    for part in value.split(','):
+        part = part.strip()
+        if not part or '=' not in part:
+            continue
+        host, spec = part.split('=', 1)
+        rate, _, burst = spec.partition(':')
+        try:
+            rates[host.strip().lower()] = (float(rate), float(burst or 1))
+        except ValueError:
+            print(f"  [Rate Limiter] Ignoring invalid limit '{part}'")
+    return rates
+
+_limiter = RateLimiter(state_file=STATE_FILE)
+for _host, _rate in _rates_from_env(os.environ.get("SCRAPER_RATE_LIMITS", "")).items():
+    _limiter.configure(_host, *_rate)
+atexit.register(_limiter.save_state)
+
+def get_rate_limiter():
+    """Returns the limiter shared by every client in this process."""
+    return _limiter
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import threading
+import requests
+
+CACHE_DB = os.path.join("downloads", ".cache", "responses.sqlite")
+
+class ResponseCache:
+    """
+    Persistent cache of API/page responses in SQLite, keyed by URL plus the
+    request headers that change the answer. Each lookup passes its own TTL, so
+    callers decide per endpoint how stale a filing list may be.
+
+    Set bypass=True (or SCRAPER_CACHE=refresh) to skip reads while still storing
+    fresh responses; SCRAPER_CACHE=off disables the cache entirely.
+    """
+
+    def __init__(self, path=CACHE_DB, bypass=False, enabled=True):
+        self.path = path
+        self.bypass = bypass
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, url TEXT, status INTEGER, content_type TEXT,"
+                " body BLOB, fetched_at REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_url ON responses(url)")
+        return self._conn
+
+    @staticmethod
+    def make_key(url, headers=None, vary=("Accept",)):
+        parts = [url]
+        for name in vary:
+            parts.append(f"{name}={(headers or {}).get(name, '')}")
+        return hashlib.sha256("\n".join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, url, ttl, headers=None):
+        """Returns a cached requests.Response younger than ttl seconds, or None."""
+        if not self.enabled or self.bypass or not ttl:
+            return None
+        key = self.make_key(url, headers)
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT status, content_type, body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or time.time() - row[3] > ttl:
+            return None
+
+        response = requests.Response()
+        response.status_code = row[0]
+        response.headers['Content-Type'] = row[1] or ''
+        response.headers['X-Cache'] = 'HIT'
+        response._content = row[2]
+        response.url = url
+        response.encoding = 'utf-8'
+        return response
+
+    def set(self, url, response, headers=None):
+        """Stores a response body for later get() calls."""
+        if not self.enabled:
+            return
+        key = self.make_key(url, headers)
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, content_type, body, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, response.status_code, response.headers.get('Content-Type', ''),
+                 response.content, time.time())
+            )
+            conn.commit()
+
+    def invalidate(self, url_prefix=""):
+        """Drops cached responses whose URL starts with url_prefix (everything by default)."""
+        with self._lock:
+            conn = self._connect()
+            cur = conn.execute(
+                "DELETE FROM responses WHERE substr(url, 1, ?) = ?", (len(url_prefix), url_prefix)
+            )
+            conn.commit()
+            return cur.rowcount
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Returns the cache shared by the NSE and annualreports.com clients."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            mode = os.environ.get("SCRAPER_CACHE", "").lower()
+            _cache = ResponseCache(bypass=(mode == "refresh"), enabled=(mode != "off"))
+        return _cache
+
+
+if __name__ == "__main__":
+    # python response_cache.py [url-prefix]  -> invalidate matching entries
+    prefix = sys.argv[1] if len(sys.argv) > 1 else ""
+    removed = ResponseCache().invalidate(prefix)
+    print(f"Removed {removed} cached responses" + (f" for {prefix}" if prefix else ""))
@@ -1,405 +1,272 @@
 import argparse
 import os
-import requests
-import sys
 import time
-import random
-import zipfile
-import io
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import console
 from annual_reports_client import AnnualReportsClient
 from nse_client import NSEClient
+from downloader import DownloadEngine
+from artifact_store import ArtifactStore
+from response_cache import get_response_cache
+from company_identity import CompanyResolver
 
-def is_valid_pdf(path):
-    """Checks if a file starts with the %PDF signature."""
-    try:
-        with open(path, 'rb') as f:
-            header = f.read(5)
-            # Some PDFs might have a few bytes before %PDF, but usually it's at start
-            return header.startswith(b'%PDF')
-    except:
-        return False
-
-def download_file(url, folder, filename, headers=None, max_retries=5):
-    if not os.path.exists(folder):
-        os.makedirs(folder)
-    
-    path = os.path.join(folder, filename)
-    if os.path.exists(path):
-        if is_valid_pdf(path):
-            print(f"  [Skipping] {filename} (already exists & valid)")
-            return
-        else:
-            print(f"  [Re-downloading] {filename} (invalid/corrupt)")
-            try:
-                os.remove(path)
-            except:
-                pass
-
-    print(f"  [Downloading] {filename}...")
-    
-    for attempt in range(max_retries):
-        try:
-            if headers is None:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                    "Referer": "https://www.annualreports.com/"
-                }
-            
-            # Add a small random delay before request to be polite
-            time.sleep(random.uniform(1.0, 3.0))
-            
-            response = requests.get(url, stream=True, timeout=60, headers=headers)
-            
-            if response.status_code == 429:
-                wait_time = (2 ** attempt) * 5  # Exponential backoff: 5, 10, 20...
-                print(f"  [Rate Limited] Sleeping for {wait_time}s before retry {attempt+1}/{max_retries}...")
-                time.sleep(wait_time)
-                continue
-                
-            response.raise_for_status()
-            
-            # Check Content-Type
-            ctype = response.headers.get('Content-Type', '').lower()
-            if 'application/pdf' not in ctype and 'binary' not in ctype:
-                if 'text/html' in ctype:
-                    print(f"  [Error] URL returned HTML instead of PDF (blocked?): {url}")
-                    # Likely blocked, maybe retry with longer sleep?
-                    if attempt < max_retries - 1:
-                        time.sleep(10)
-                        continue
-                    return
-
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
-            
-            with open(path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-                    downloaded += len(chunk)
-                    # Print progress every ~1MB
-                    sys.stdout.write(f"\r  [Downloading] {filename} - {downloaded / 1024 / 1024:.2f} MB")
-                    sys.stdout.flush()
-            print(f"\n  [Done] {filename}")
-            
-            # Check for ZIP signature
-            is_zip = False
-            try:
-                is_zip = zipfile.is_zipfile(path)
-            except Exception:
-                pass
-
-            if is_zip:
-                print(f"  [Info] Detected ZIP file. Extracting...")
-                try:
-                    with zipfile.ZipFile(path, 'r') as z:
-                        # Find first PDF in zip
-                        pdfs = [n for n in z.namelist() if n.lower().endswith('.pdf')]
-                        if pdfs:
-                            print(f"  [Info] Extracting {pdfs[0]} from zip...")
-                            # Extract to temporary path
-                            z.extract(pdfs[0], folder)
-                            extracted_path = os.path.join(folder, pdfs[0])
-                            
-                            # Replace the ZIP file with the extracted PDF
-                            if os.path.exists(extracted_path):
-                                z.close()
-                                os.remove(path) # Remove the zip
-                                os.rename(extracted_path, path) # Rename extracted pdf to target name
-                                print(f"  [Success] Extracted and saved as {filename}")
-                            else:
-                                 print("  [Error] Extraction failed, file not found.")
-                        else:
-                            print("  [Error] No PDF found inside ZIP.")
-                except Exception as e:
-                    print(f"  [Error] Failed to extract ZIP: {e}")
-            
-            # Final Verification (Debug prints removed)
-            if not is_valid_pdf(path):
-                print(f"  [Error] Downloaded file is not a valid PDF header.")
-                try:
-                    with open(path, 'rb') as f:
-                        head = f.read(200)
-                    print(f"  [Debug] Header: {head}")
-                    
-                    # Rename to .html or .txt for inspection
-                    debug_path = path + ".debug.html"
-                    if os.path.exists(debug_path):
-                        try: os.remove(debug_path)
-                        except: pass
-                    os.rename(path, debug_path)
-                    print(f"  [Debug] Saved invalid file to {debug_path}")
-                except Exception as e:
-                    print(f"  [Debug Error] {e}")
-                    if os.path.exists(path): os.remove(path)
-            else:
-                # Successful download, break retry loop
-                return
-                
-        except requests.exceptions.RequestException as e:
-            print(f"\n  [Network Error] {e}")
-            if attempt < max_retries - 1:
-                wait_time = (2 ** attempt) * 2
-                print(f"  Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                print(f"  [Failed] Max retries exceeded for {filename}")
-
-        except Exception as e:
-            print(f"\n  [Error] Failed to download {url}: {e}")
-            if os.path.exists(path):
-                try:
-                    os.remove(path)
-                except: 
-                    pass
-            break
+DOWNLOAD_BASE = "downloads"
 
 def sanitize_filename(name):
     return "".join([c for c in name if c.isalpha() or c.isdigit() or c in (' ', '-', '_')]).strip()
 
-def main():
-    parser = argparse.ArgumentParser(description="ESG & BRSR Data Scraper - Full Pipeline")
-    parser.add_argument("--company", required=True, help="Company name to search for")
-    parser.add_argument("--modal-url", help="Modal App URL for BRSR Analysis. If provided, analysis runs after download.")
-    parser.add_argument("--skip-news", action="store_true", help="Skip news and social media scraping (faster)")
-    parser.add_argument("--skip-sustainability", action="store_true", help="Skip sustainability reports scraping")
-    
-    args = parser.parse_args()
-    
-    company_query = args.company
-    
-    print("=" * 80)
-    print(f"🚀 FULL PIPELINE: ESG & BRSR Data Collection for '{company_query}'")
-    print("=" * 80)
-    print("\nPipeline Steps:")
-    print("  1. AnnualReports.com - Annual Reports")
-    print("  2. NSE India - Annual Reports & Standalone BRSR")
-    if not args.skip_news:
-        print("  3. News & Social Media - Google News, Reddit")
-    if not args.skip_sustainability:
-        print("  4. Sustainability Reports - TCFD, CDP, GRI")
-    if args.modal_url:
-        print("  5. BRSR Analysis - LLM Processing")
-    print("\n" + "=" * 80)
-    
-    download_base = "downloads"
-    sanitized_company = sanitize_filename(company_query)
-    
-    # ============================================================================
-    # STEP 1: AnnualReports.com - Annual Reports
-    # ============================================================================
+class StepTracker:
+    """
+    Decides which pipeline steps run and records how they ended.
+    The default runs everything and remembers nothing; batch.py swaps in a
+    persistent tracker so restarted runs skip finished steps.
+    """
+
+    def should_run(self, step):
+        return True
+
+    def start(self, step):
+        pass
+
+    def done(self, step):
+        pass
+
+    def failed(self, step, error):
+        pass
+
+def _print_step_header(title):
     print("\n" + "=" * 80)
-    print("STEP 1: AnnualReports.com - Annual Reports")
+    print(title)
     print("=" * 80)
-    
-    ar_client = AnnualReportsClient()
-    ar_results = ar_client.search_company(company_query)
-    
+
+def step_annualreports(company_query, sanitized_company, engine, ar_client, download_base=DOWNLOAD_BASE,
+                       identity=None):
+    """STEP 1: queue annual reports from AnnualReports.com on the download engine."""
+    _print_step_header("STEP 1: AnnualReports.com - Annual Reports")
+
+    if identity and identity.get('ar_url'):
+        ar_results = [{"name": identity.get('ar_name') or identity['name'], "url": identity['ar_url']}]
+    else:
+        ar_results = ar_client.search_company(company_query)
+
     if not ar_results:
         print("❌ Company not found on AnnualReports.com")
         print("   Continuing with other data sources...")
+        return
+
+    target = ar_results[0]
+    print(f"✅ Found: {target['name']}")
+
+    # Create folder: downloads/annualreports.com/{company}/
+    ar_folder = os.path.join(download_base, "annualreports.com", sanitized_company)
+    if not os.path.exists(ar_folder):
+        os.makedirs(ar_folder)
+
+    print(f"\n📄 Collecting Annual Reports...")
+    reports = ar_client.get_annual_reports(target['url'])
+    print(f"   Found {len(reports)} Annual Reports")
+
+    for report in reports:
+        fname = f"{report['year']}_AnnualReport.pdf"
+        engine.add(report['url'], ar_folder, fname, headers=ar_client.headers)
+
+def brsr_filename(report, ext=".pdf"):
+    """File name for a standalone BRSR filing, e.g. BRSR_2025_06-Sep-2025_173124.pdf"""
+    date = report.get('date', '').replace(':', '').replace(' ', '_')
+    return f"BRSR_{report['year']}_{date}{ext}"
+
+def queue_brsr_report(engine, report, brsr_folder, headers=None):
+    """Queues a BRSR PDF and, when NSE has one, its XBRL instance under the same name."""
+    companion = brsr_filename(report, ".xml") if report.get('xbrl_url') else None
+    engine.add(report['url'], brsr_folder, brsr_filename(report), headers=headers, companion=companion)
+    if report.get('xbrl_url'):
+        engine.add(report['xbrl_url'], brsr_folder, brsr_filename(report, ".xml"), headers=headers, expect="xml")
+
+def step_nse(company_query, sanitized_company, engine, nse_client, download_base=DOWNLOAD_BASE, identity=None):
+    """STEP 2: queue NSE annual reports and standalone BRSR filings on the download engine."""
+    _print_step_header("STEP 2: NSE India - Annual Reports & BRSR")
+
+    if identity and identity.get('symbol'):
+        nse_results = [{"symbol": identity['symbol'], "name": identity['name']}]
     else:
-        target = ar_results[0]
-        print(f"✅ Found: {target['name']}")
-        
-        # Create folder: downloads/annualreports.com/{company}/
-        ar_folder = os.path.join(download_base, "annualreports.com", sanitized_company)
-        if not os.path.exists(ar_folder):
-            os.makedirs(ar_folder)
-        
-        print(f"\n📄 Downloading Annual Reports...")
-        reports = ar_client.get_annual_reports(target['url'])
-        print(f"   Found {len(reports)} Annual Reports")
-        
-        for report in reports:
-            fname = f"{report['year']}_AnnualReport.pdf"
-            download_file(report['url'], ar_folder, fname, headers=ar_client.headers)
-    
-    # ============================================================================
-    # STEP 2: NSE India - Annual Reports & Standalone BRSR
-    # ============================================================================
-    print("\n" + "=" * 80)
-    print("STEP 2: NSE India - Annual Reports & BRSR")
-    print("=" * 80)
-    
-    nse_client = NSEClient()
-    nse_results = nse_client.search_company(company_query)
-    
+        nse_results = nse_client.search_company(company_query)
+
     if not nse_results:
         print("❌ Company not found on NSE India")
         print("   Continuing with other data sources...")
+        return
+
+    target = nse_results[0]
+    print(f"✅ Found: {target['name']} ({target['symbol']})")
+
+    # Create folder: downloads/nseindia.com/{company}/
+    nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
+    if not os.path.exists(nse_folder):
+        os.makedirs(nse_folder)
+
+    # 2A. Download Annual Reports
+    print(f"\n📄 Collecting Annual Reports...")
+    reports = nse_client.get_annual_reports(target['symbol'])
+    print(f"   Found {len(reports)} Annual Reports")
+
+    for report in reports:
+        desc = sanitize_filename(report['description'])
+        fname = f"{report['year']}_{desc}.pdf"
+        if not fname.endswith('.pdf'):
+            fname += ".pdf"
+        engine.add(report['url'], nse_folder, fname, headers=nse_client.session.headers)
+
+    # 2B. Download Standalone BRSR Reports
+    print(f"\n📊 Collecting Standalone BRSR Reports...")
+    brsr_reports = nse_client.get_brsr_reports(target['symbol'])
+
+    if brsr_reports:
+        brsr_folder = os.path.join(nse_folder, "BRSR")
+        if not os.path.exists(brsr_folder):
+            os.makedirs(brsr_folder)
+
+        print(f"   Found {len(brsr_reports)} standalone BRSR reports")
+
+        for report in brsr_reports:
+            queue_brsr_report(engine, report, brsr_folder, headers=nse_client.session.headers)
+    else:
+        print(f"   ℹ️  No standalone BRSR reports found")
+        print(f"   Note: Most companies embed BRSR within Annual Reports (2021+)")
+
+def step_news(company_query, sanitized_company, download_base=DOWNLOAD_BASE):
+    """STEP 3: Google News articles and Reddit posts."""
+    _print_step_header("STEP 3: News & Social Media")
+
+    from news_scraper import NewsScraper
+    from near_duplicates import NearDuplicateIndex
+
+    news_scraper = NewsScraper()
+
+    # Save in NSE company folder: downloads/nseindia.com/{company}/News
+    nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
+    news_folder = os.path.join(nse_folder, "News")
+    social_folder = os.path.join(nse_folder, "Social")
+
+    # 3A. News (Google News RSS)
+    print(f"\n📰 Fetching News Articles...")
+    # Syndicated copies of a story are recognised across runs by their fingerprints
+    dedupe_index = NearDuplicateIndex(os.path.join(news_folder, "near_duplicates.json"))
+    news_items = news_scraper.fetch_massive_news(company_query, total_limit=50, dedupe_index=dedupe_index)
+    if news_items:
+        news_scraper.save_data(news_items, news_folder, "news_fulltext")
+        print(f"   ✅ Saved {len(news_items)} news articles")
+    else:
+        print(f"   ⚠️  No news articles found")
+
+    # 3B. Social Media (Reddit)
+    print(f"\n💬 Fetching Social Media Posts...")
+    social_items = news_scraper.fetch_reddit_posts(company_query, limit=50)
+    if social_items:
+        news_scraper.save_data(social_items, social_folder, "social_media_consolidated")
+        print(f"   ✅ Saved {len(social_items)} social media posts")
     else:
-        target = nse_results[0]
-        print(f"✅ Found: {target['name']} ({target['symbol']})")
-        
-        # Create folder: downloads/nseindia.com/{company}/
-        nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
-        if not os.path.exists(nse_folder):
-            os.makedirs(nse_folder)
-        
-        # 2A. Download Annual Reports
-        print(f"\n📄 Downloading Annual Reports...")
-        reports = nse_client.get_annual_reports(target['symbol'])
-        print(f"   Found {len(reports)} Annual Reports")
-        
-        for report in reports:
-            desc = sanitize_filename(report['description'])
-            fname = f"{report['year']}_{desc}.pdf"
-            if not fname.endswith('.pdf'): 
-                fname += ".pdf"
-            download_file(report['url'], nse_folder, fname, headers=nse_client.session.headers)
-        
-        # 2B. Download Standalone BRSR Reports
-        print(f"\n📊 Downloading Standalone BRSR Reports...")
-        brsr_reports = nse_client.get_brsr_reports(target['symbol'])
-        
-        if brsr_reports:
-            brsr_folder = os.path.join(nse_folder, "BRSR")
-            if not os.path.exists(brsr_folder):
-                os.makedirs(brsr_folder)
-            
-            print(f"   Found {len(brsr_reports)} standalone BRSR reports")
-            
-            for report in brsr_reports:
-                year = report['year']
-                date = report.get('date', '').replace(':', '').replace(' ', '_')
-                fname = f"BRSR_{year}_{date}.pdf"
-                download_file(report['url'], brsr_folder, fname, headers=nse_client.session.headers)
+        print(f"   ⚠️  No social media posts found")
+
+def step_sustainability(company_query, sanitized_company, download_base=DOWNLOAD_BASE):
+    """STEP 4: TCFD, sustainability and CDP reports found via DuckDuckGo."""
+    _print_step_header("STEP 4: Sustainability Reports")
+
+    from search_scraper import SearchScraper
+
+    searcher = SearchScraper()
+
+    # Save in NSE company folder: downloads/nseindia.com/{company}/Sustainability
+    nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
+    sust_folder = os.path.join(nse_folder, "Sustainability")
+
+    print(f"\n🌱 Searching for Sustainability Reports...")
+
+    # TCFD Reports
+    print(f"   - TCFD Reports...")
+    searcher.search_and_download_pdfs(company_query, "TCFD Report", sust_folder)
+
+    # Sustainability Reports
+    print(f"   - Sustainability Reports...")
+    searcher.search_and_download_pdfs(company_query, "Sustainability Report", sust_folder)
+
+    # CDP Reports
+    print(f"   - CDP Reports...")
+    searcher.search_and_download_pdfs(company_query, "CDP Report", sust_folder)
+
+    print(f"   ✅ Sustainability reports search completed")
+
+def report_pdfs(sanitized_company, download_base=DOWNLOAD_BASE):
+    """The NSE reports analysis covers: the company folder and its BRSR/ subfolder."""
+    nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
+    pdfs = []
+    for folder in (nse_folder, os.path.join(nse_folder, "BRSR")):
+        if os.path.exists(folder):
+            pdfs += [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.lower().endswith('.pdf')]
+    return pdfs
+
+def start_analysis(modal_url, store=None):
+    """An AnalysisQueue with its consumer running, ready to take reports as they download."""
+    from process_reports import BRSRAnalyzer, AnalysisQueue, QUESTIONS_FILE
+    return AnalysisQueue(BRSRAnalyzer(modal_url, QUESTIONS_FILE), store=store)
+
+class ReportFeed:
+    """
+    DownloadEngine on_complete callback that hands each finished PDF to an
+    AnalysisQueue. A PDF with a companion XBRL file is held until that file
+    has finished (or failed), so its analysis can use the XBRL answers.
+    """
+
+    def __init__(self, analysis):
+        self.analysis = analysis
+        self._finished = set()
+        self._waiting = {}
+
+    def __call__(self, job, path):
+        key = os.path.join(job['folder'], job['filename'])
+        self._finished.add(key)
+        if job.get('expect') == 'pdf':
+            companion = job.get('companion')
+            if path and companion and os.path.join(job['folder'], companion) not in self._finished:
+                self._waiting[os.path.join(job['folder'], companion)] = path
+                return
+            ready = path
         else:
-            print(f"   ℹ️  No standalone BRSR reports found")
-            print(f"   Note: Most companies embed BRSR within Annual Reports (2021+)")
-    
-    # ============================================================================
-    # STEP 3: News & Social Media
-    # ============================================================================
-    if not args.skip_news:
-        print("\n" + "=" * 80)
-        print("STEP 3: News & Social Media")
-        print("=" * 80)
-        
-        try:
-            from news_scraper import NewsScraper
-            
-            news_scraper = NewsScraper()
-            
-            # Save in NSE company folder: downloads/nseindia.com/{company}/News
-            nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
-            news_folder = os.path.join(nse_folder, "News")
-            social_folder = os.path.join(nse_folder, "Social")
-            
-            # 3A. News (Google News RSS)
-            print(f"\n📰 Fetching News Articles...")
-            news_items = news_scraper.fetch_massive_news(company_query, total_limit=50)
-            if news_items:
-                news_scraper.save_data(news_items, news_folder, "news_fulltext")
-                print(f"   ✅ Saved {len(news_items)} news articles")
-            else:
-                print(f"   ⚠️  No news articles found")
-            
-            # 3B. Social Media (Reddit)
-            print(f"\n💬 Fetching Social Media Posts...")
-            social_items = news_scraper.fetch_reddit_posts(company_query, limit=50)
-            if social_items:
-                news_scraper.save_data(social_items, social_folder, "social_media_consolidated")
-                print(f"   ✅ Saved {len(social_items)} social media posts")
-            else:
-                print(f"   ⚠️  No social media posts found")
-                
-        except Exception as e:
-            print(f"   ❌ Error in news/social scraping: {e}")
-            print(f"   Continuing with pipeline...")
-    
-    # ============================================================================
-    # STEP 4: Sustainability Reports (TCFD, CDP, GRI)
-    # ============================================================================
-    if not args.skip_sustainability:
-        print("\n" + "=" * 80)
-        print("STEP 4: Sustainability Reports")
-        print("=" * 80)
-        
-        try:
-            from search_scraper import SearchScraper
-            
-            searcher = SearchScraper()
-            
-            # Save in NSE company folder: downloads/nseindia.com/{company}/Sustainability
-            nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
-            sust_folder = os.path.join(nse_folder, "Sustainability")
-            
-            print(f"\n🌱 Searching for Sustainability Reports...")
-            
-            # TCFD Reports
-            print(f"   - TCFD Reports...")
-            searcher.search_and_download_pdfs(company_query, "TCFD Report", sust_folder)
-            
-            # Sustainability Reports
-            print(f"   - Sustainability Reports...")
-            searcher.search_and_download_pdfs(company_query, "Sustainability Report", sust_folder)
-            
-            # CDP Reports
-            print(f"   - CDP Reports...")
-            searcher.search_and_download_pdfs(company_query, "CDP Report", sust_folder)
-            
-            print(f"   ✅ Sustainability reports search completed")
-            
-        except Exception as e:
-            print(f"   ❌ Error in sustainability scraping: {e}")
-            print(f"   Continuing with pipeline...")
-    
-    # ============================================================================
-    # STEP 5: BRSR Analysis (Optional - if Modal URL provided)
-    # ============================================================================
-    if args.modal_url:
-        print("\n" + "=" * 80)
-        print("STEP 5: BRSR Analysis with LLM")
-        print("=" * 80)
-        
-        try:
-            from process_reports import BRSRAnalyzer, QUESTIONS_FILE
-            
-            # Analyze NSE folder (which has BRSR data)
-            nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
-            
-            # Analyze NSE folder (which has BRSR data)
-            nse_folder = os.path.join(download_base, "nseindia.com", sanitized_company)
-            
-            if not os.path.exists(nse_folder):
-                print(f"   ⚠️  NSE folder not found. Skipping BRSR analysis.")
-                print(f"   (Analysis requires NSE data)")
-            else:
-                # Check if we have any PDFs to analyze
-                pdf_count = sum(1 for f in os.listdir(nse_folder) if f.endswith('.pdf'))
-                brsr_folder = os.path.join(nse_folder, "BRSR")
-                if os.path.exists(brsr_folder):
-                    pdf_count += sum(1 for f in os.listdir(brsr_folder) if f.endswith('.pdf'))
-                
-                if pdf_count == 0:
-                    print(f"   ⚠️  No PDFs found to analyze. Skipping BRSR analysis.")
-                else:
-                    print(f"   📊 Found {pdf_count} PDFs to analyze")
-                    print(f"   🤖 Starting LLM analysis...")
-                    
-                    analyzer = BRSRAnalyzer(
-                        folder_path=nse_folder,
-                        questions_json=QUESTIONS_FILE,
-                        modal_url=args.modal_url
-                    )
-                    
-                    output_file = analyzer.run()
-                    
-                    if output_file:
-                        print(f"   ✅ Analysis completed!")
-                        print(f"   📄 Output saved to: {output_file}")
-                    else:
-                        print(f"   ⚠️  Analysis completed with warnings")
-                    
-        except Exception as e:
-            print(f"   ❌ Error in BRSR analysis: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    # ============================================================================
-    # PIPELINE COMPLETE
-    # ============================================================================
+            ready = self._waiting.pop(key, None)
+        if ready:
+            self.analysis.submit(ready)
+
+def step_analysis(sanitized_company, modal_url, download_base=DOWNLOAD_BASE, analysis=None):
+    """
+    STEP 5: LLM analysis of the NSE reports (requires a Modal URL).
+    With a running AnalysisQueue, reports fed to it during the downloads are
+    already in progress; this queues whatever else is on disk and waits.
+    """
+    _print_step_header("STEP 5: BRSR Analysis with LLM")
+
+    if analysis is None:
+        analysis = start_analysis(modal_url)
+    queued = sum(1 for pdf in report_pdfs(sanitized_company, download_base) if analysis.submit(pdf))
+    total = len(analysis)
+
+    if total == 0:
+        analysis.close()
+        print(f"   ⚠️  No NSE PDFs found to analyze. Skipping BRSR analysis.")
+        print(f"   (Analysis requires NSE data)")
+        return
+
+    print(f"   📊 {total} PDFs to analyze ({total - queued} started during downloads)")
+    print(f"   🤖 Waiting for LLM analysis...")
+    outputs = analysis.close()
+
+    for output_file in outputs:
+        print(f"   📄 Output saved to: {output_file}")
+    if analysis.errors:
+        print(f"   ⚠️  Analysis completed with {len(analysis.errors)} failed reports")
+        raise RuntimeError(f"{len(analysis.errors)} reports failed analysis")
+    print(f"   ✅ Analysis completed!")
+
+def print_summary(sanitized_company, download_base=DOWNLOAD_BASE):
     print("\n" + "=" * 80)
     print("✅ PIPELINE COMPLETED SUCCESSFULLY!")
     print("=" * 80)
@@ -412,26 +279,26 @@ def main():
     print(f"                        ├── Social/")
     print(f"                        └── Sustainability/")
     print(f"\n📂 Folder Structure:")
-    
+
     # Display folder structure for all sources
     all_folders = [
         os.path.join(download_base, "annualreports.com", sanitized_company),
         os.path.join(download_base, "nseindia.com", sanitized_company)
     ]
-    
+
     for base_folder in all_folders:
         if os.path.exists(base_folder):
             source_name = base_folder.split(os.sep)[-2]  # Get source folder name
             print(f"\n📦 {source_name}/")
-            
+
             for root, dirs, files in os.walk(base_folder):
                 level = root.replace(base_folder, '').count(os.sep)
                 indent = '  ' * (level + 1)
                 folder_name = os.path.basename(root) or sanitized_company
-                
+
                 if root != base_folder:
                     print(f"{indent}📂 {folder_name}/")
-                
+
                 subindent = '  ' * (level + 2)
                 # Show first 3 files per folder
                 for i, file in enumerate(sorted(files)[:3]):
@@ -440,11 +307,193 @@ def main():
                         print(f"{subindent}📄 {file} ({size:.2f} MB)")
                     elif file.endswith('.json'):
                         print(f"{subindent}📊 {file}")
-                
+
                 if len(files) > 3:
                     print(f"{subindent}   ... and {len(files) - 3} more files")
-    
+
+    print("\n" + "=" * 80)
+
+def _run_step(tracker, step, func, *args, finish=True):
+    """
+    Runs one pipeline step under the tracker. Errors are reported and recorded
+    but never stop the remaining steps. Returns True if the step ran cleanly.
+    With finish=False the caller marks the step done later (after downloads).
+    """
+    if not tracker.should_run(step):
+        print(f"\n⏭️  Skipping step '{step}' (already completed)")
+        return False
+    tracker.start(step)
+    try:
+        func(*args)
+    except Exception as e:
+        print(f"   ❌ Error in {step} step: {e}")
+        print(f"   Continuing with pipeline...")
+        tracker.failed(step, str(e))
+        return False
+    if finish:
+        tracker.done(step)
+    return True
+
+def _collect_step(tracker, step, func, kwargs, store=None, on_complete=None):
+    """
+    Runs one collection step with its output captured, so concurrent steps do
+    not interleave. With a store, the step gets its own DownloadEngine and
+    counts as done only once all its queued downloads succeeded; on_complete
+    is the engine's per-file callback.
+    Returns {step, status, elapsed, output}.
+    """
+    started = time.time()
+    with console.CapturedOutput() as captured:
+        if not tracker.should_run(step):
+            status = "skipped"
+            _run_step(tracker, step, func)
+        else:
+            engine = None
+            if store is not None:
+                engine = DownloadEngine(store=store, on_complete=on_complete)
+                kwargs = dict(kwargs, engine=engine)
+            status = "done" if _run_step(tracker, step, partial(func, **kwargs), finish=engine is None) else "failed"
+            if engine is not None and status == "done":
+                try:
+                    results = []
+                    if engine.jobs:
+                        print(f"\n⬇️  Downloading {len(engine.jobs)} reports ({step})...")
+                        results = engine.run()
+                    failed = sum(1 for _, path in results if path is None)
+                    if failed:
+                        # Left pending so the next run retries it; files already on disk are skipped
+                        print(f"   ❌ {failed} {step} downloads failed")
+                        tracker.failed(step, f"{failed} downloads failed")
+                        status = "failed"
+                    else:
+                        tracker.done(step)
+                except Exception as e:
+                    print(f"   ❌ Error downloading {step} reports: {e}")
+                    tracker.failed(step, str(e))
+                    status = "failed"
+    return {"step": step, "status": status, "elapsed": time.time() - started, "output": captured.getvalue()}
+
+def print_step_timings(results, total):
+    """Combined status and wall time of the steps that ran in parallel."""
     print("\n" + "=" * 80)
+    print("STEP SUMMARY")
+    print("=" * 80)
+    icons = {"done": "✅", "failed": "❌", "skipped": "⏭️ "}
+    for result in results:
+        print(f"   {icons.get(result['status'], '•')} {result['step']:<16} {result['status']:<8} {result['elapsed']:7.1f}s")
+    print(f"   Wall time: {total:.1f}s (sum of steps: {sum(r['elapsed'] for r in results):.1f}s)")
+
+def resolve_company(company_query, resolver):
+    """
+    Resolves the query to its canonical company and returns (identity, folder name).
+    Folders are named after the identity, so different spellings share them.
+    """
+    try:
+        identity = resolver.resolve(company_query)
+    except Exception as e:
+        print(f"⚠️  Could not resolve '{company_query}' to a known company: {e}")
+        return None, sanitize_filename(company_query)
+    folder = sanitize_filename(identity['key']) or sanitize_filename(company_query)
+    if identity.get('symbol') or identity.get('ar_slug'):
+        print(f"🔎 '{company_query}' resolved to {identity['name']} (folder: {folder})")
+    return identity, folder
+
+def run_pipeline(company_query, modal_url=None, skip_news=False, skip_sustainability=False,
+                 tracker=None, ar_client=None, nse_client=None, store=None,
+                 download_base=DOWNLOAD_BASE, show_summary=True, resolver=None):
+    """
+    Runs every pipeline step for one company. Clients, the artifact store and the
+    company resolver can be passed in so batch workers share sessions and connection pools.
+    Collection steps 1-4 run concurrently; analysis runs once they have all finished.
+    """
+    tracker = tracker or StepTracker()
+    ar_client = ar_client or AnnualReportsClient()
+    nse_client = nse_client or NSEClient()
+    resolver = resolver or CompanyResolver(nse_client, ar_client)
+
+    print("=" * 80)
+    print(f"🚀 FULL PIPELINE: ESG & BRSR Data Collection for '{company_query}'")
+    print("=" * 80)
+    print("\nPipeline Steps:")
+    print("  1. AnnualReports.com - Annual Reports")
+    print("  2. NSE India - Annual Reports & Standalone BRSR")
+    if not skip_news:
+        print("  3. News & Social Media - Google News, Reddit")
+    if not skip_sustainability:
+        print("  4. Sustainability Reports - TCFD, CDP, GRI")
+    if modal_url:
+        print("  5. BRSR Analysis - LLM Processing")
+    print("\n" + "=" * 80)
+
+    identity, sanitized_company = resolve_company(company_query, resolver)
+    store = store or ArtifactStore()
+
+    # With analysis on, NSE reports are analyzed as soon as each one has
+    # downloaded and validated, while the other steps are still running
+    analysis = None
+    if modal_url and tracker.should_run("analysis"):
+        try:
+            analysis = start_analysis(modal_url, store)
+        except Exception as e:
+            # step_analysis reports the problem when it runs
+            print(f"⚠️  Could not start analysis early: {e}")
+
+    # Steps 1-4 hit different hosts and share no data, so they run at the same
+    # time. Steps 1 & 2 each fetch their queued reports on their own engine;
+    # per-host download slots and the artifact store are still shared.
+    common = dict(company_query=company_query, sanitized_company=sanitized_company, download_base=download_base)
+    tasks = [
+        ("annualreports", step_annualreports, dict(common, ar_client=ar_client, identity=identity), True, None),
+        ("nse", step_nse, dict(common, nse_client=nse_client, identity=identity), True,
+         ReportFeed(analysis) if analysis is not None else None),
+    ]
+    if not skip_news:
+        tasks.append(("news", step_news, common, False, None))
+    if not skip_sustainability:
+        tasks.append(("sustainability", step_sustainability, common, False, None))
+
+    print(f"\n⚡ Running {len(tasks)} collection steps in parallel...")
+    started = time.time()
+    results = []
+    with ThreadPoolExecutor(max_workers=len(tasks)) as pool:
+        futures = [
+            pool.submit(_collect_step, tracker, step, func, kwargs, store if downloads else None, on_complete)
+            for step, func, kwargs, downloads, on_complete in tasks
+        ]
+        # Each step's output is shown as one block, in the order the steps finish
+        for future in as_completed(futures):
+            result = future.result()
+            print(result["output"], end="")
+            print(f"\n   ⏱️  {result['step']} {result['status']} in {result['elapsed']:.1f}s")
+            results.append(result)
+
+    print_step_timings(results, time.time() - started)
+
+    if modal_url:
+        _run_step(tracker, "analysis", step_analysis, sanitized_company, modal_url, download_base, analysis)
+
+    if show_summary:
+        print_summary(sanitized_company, download_base)
+
+def main():
+    parser = argparse.ArgumentParser(description="ESG & BRSR Data Scraper - Full Pipeline")
+    parser.add_argument("--company", required=True, help="Company name to search for")
+    parser.add_argument("--modal-url", help="Modal App URL for BRSR Analysis. If provided, analysis runs after download.")
+    parser.add_argument("--skip-news", action="store_true", help="Skip news and social media scraping (faster)")
+    parser.add_argument("--skip-sustainability", action="store_true", help="Skip sustainability reports scraping")
+    parser.add_argument("--refresh-cache", action="store_true", help="Ignore cached NSE/AnnualReports.com API responses (fresh answers are still cached)")
+
+    args = parser.parse_args()
+
+    if args.refresh_cache:
+        get_response_cache().bypass = True
+
+    run_pipeline(
+        args.company,
+        modal_url=args.modal_url,
+        skip_news=args.skip_news,
+        skip_sustainability=args.skip_sustainability,
+    )
 
 if __name__ == "__main__":
     main()
@@ -1,14 +1,15 @@
-import requests
-from bs4 import BeautifulSoup
+from html_parser import extract_links
 import re
 import os
 import urllib.parse
+from http_client import get_session
 
 class SearchScraper:
     def __init__(self):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.session = get_session()
 
     def search_and_download_pdfs(self, company, report_type, download_folder, limit=3):
         """
@@ -23,18 +24,18 @@ class SearchScraper:
         data = {'q': query}
         
         try:
-            response = requests.post(url, data=data, headers=self.headers)
+            response = self.session.post(url, data=data, headers=self.headers)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = soup.find_all('a', class_='result__a')
+            # Only the result links are needed, so the page is streamed, not parsed into a tree
+            results = extract_links(response.text, class_='result__a')
             
             count = 0
             for link in results:
                 if count >= limit: break
                 
                 href = link['href']
-                title = link.text.strip()
+                title = link['text']
                 
                 # Check directly if it looks like a PDF url
                 # DuckDuckGo sometimes wraps URLs, but usually not in HTML version or easy to extract
@@ -80,7 +81,7 @@ class SearchScraper:
         print(f"    [Downloading] {filename}...")
         try:
             # Need strict headers often for these corporate sites
-            response = requests.get(url, headers=self.headers, stream=True, timeout=30)
+            response = self.session.get(url, headers=self.headers, stream=True, timeout=30)
             
             # Check content type
             ct = response.headers.get('Content-Type', '').lower()
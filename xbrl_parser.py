@@ -0,0 +1,131 @@
+import logging
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+XBRLI_NS = "{http://www.xbrl.org/2003/instance}"
+XBRLDI_NS = "{http://xbrl.org/2006/xbrldi}"
+
+# brsr_questions.json question -> BRSR taxonomy elements (local names) that answer it.
+# Facts are matched by local name, so taxonomy namespace versions do not matter.
+# Questions not listed here (or not present in a filing) still go to the LLM.
+XBRL_QUESTION_MAP = {
+    "Corporate Identity Number (CIN) of the Listed Entity": ["CorporateIdentityNumber"],
+    "Name of the Listed Entity": ["NameOfTheCompany", "NameOfTheListedEntity"],
+    "Year of incorporation": ["YearOfIncorporation", "DateOfIncorporation"],
+    "Registered office address": ["AddressOfRegisteredOfficeOfCompany", "RegisteredOfficeAddress"],
+    "Corporate address": ["AddressOfCorporateOfficeOfCompany", "CorporateAddress"],
+    "E-mail": ["EMailOfTheCompany", "EmailOfTheCompany"],
+    "Telephone": ["TelephoneOfCompany", "TelephoneNumberOfCompany"],
+    "Website": ["WebsiteOfCompany"],
+    "Financial year for which reporting is being done": ["DateOfStartOfFinancialYear", "DateOfEndOfFinancialYear"],
+    "Name of the Stock Exchange(s) where shares are listed": ["NameOfTheStockExchange", "NameOfStockExchangeWhereSharesAreListed"],
+    "Paid-up Capital": ["PaidUpCapital", "ValueOfSharesPaidUp"],
+    "Name and contact details (telephone, email address) of the person who may be contacted in case of any queries on the BRSR report": [
+        "NameOfContactPerson", "ContactNumberOfContactPerson", "EMailOfContactPerson"],
+    "(i) Whether CSR is applicable as per section 135 of Companies Act, 2013: (Yes/No)": [
+        "WhetherCorporateSocialResponsibilityIsApplicableAsPerSection135OfCompaniesAct2013",
+        "WhetherCSRIsApplicableAsPerSection135OfCompaniesAct2013"],
+    "2. Turnover (in Rs.)": ["Turnover"],
+    "3. Net worth (in Rs.)": ["NetWorth"],
+    "Details of total energy consumption (in Joules or multiples) and energy intensity:": [
+        "TotalEnergyConsumption", "EnergyIntensityPerRupeeOfTurnover"],
+    "Provide details of the following disclosures related to water:": [
+        "TotalVolumeOfWaterWithdrawal", "TotalVolumeOfWaterConsumption", "WaterIntensityPerRupeeOfTurnover"],
+    "Provide details of greenhouse gas emissions (Scope 1 and Scope 2 emissions) & its intensity:": [
+        "TotalScope1Emissions", "TotalScope2Emissions",
+        "TotalScope1AndScope2EmissionsPerRupeeOfTurnover"],
+    "Please provide details of total Scope 3 emissions & its intensity:": [
+        "TotalScope3Emissions", "TotalScope3EmissionsPerRupeeOfTurnover"],
+    "a. Number of affiliations with trade and industry chambers/ associations.": [
+        "NumberOfAffiliationsWithTradeAndIndustryChambersOrAssociations"],
+}
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _parse_context(elem):
+    """Period label and explicit dimension members of an xbrli:context element."""
+    instant = elem.findtext(f".//{XBRLI_NS}instant")
+    start = elem.findtext(f".//{XBRLI_NS}startDate")
+    end = elem.findtext(f".//{XBRLI_NS}endDate")
+    period = instant or (f"{start} to {end}" if start and end else "")
+    dimensions = {}
+    for member in elem.iter(f"{XBRLDI_NS}explicitMember"):
+        # Dimensions and members are QNames such as "in-capmkt:PlantMember"
+        dimension = member.get('dimension', '').split(':')[-1]
+        dimensions[dimension] = (member.text or '').strip().split(':')[-1]
+    return {"period": period, "dimensions": dimensions}
+
+def parse_xbrl(path):
+    """
+    Streams an XBRL instance with iterparse, keeping only contexts and facts.
+    Returns {'contexts': {id: {...}}, 'facts': {local_name: [{'value', 'context', 'unit'}]}}
+    or None if the file cannot be parsed.
+    """
+    contexts = {}
+    facts = {}
+    depth = 0
+    try:
+        for event, elem in ET.iterparse(path, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            # Contexts, units and facts are direct children of the root element
+            if depth != 1:
+                continue
+            if elem.tag == f"{XBRLI_NS}context":
+                contexts[elem.get('id')] = _parse_context(elem)
+            elif elem.get('contextRef'):
+                value = (elem.text or '').strip()
+                if value:
+                    facts.setdefault(_local_name(elem.tag), []).append({
+                        "value": value,
+                        "context": elem.get('contextRef'),
+                        "unit": elem.get('unitRef'),
+                    })
+            # Free the subtree; filings can hold thousands of facts
+            elem.clear()
+    except (ET.ParseError, OSError) as e:
+        logger.error(f"Error parsing XBRL {path}: {e}")
+        return None
+
+    logger.info(f"Parsed {sum(len(v) for v in facts.values())} facts from {path}")
+    return {"contexts": contexts, "facts": facts}
+
+def _format_fact(name, fact, contexts):
+    context = contexts.get(fact['context'], {})
+    details = [context.get('period', '')]
+    details += [f"{dim}={member}" for dim, member in context.get('dimensions', {}).items()]
+    if fact.get('unit'):
+        details.append(fact['unit'])
+    label = ", ".join(d for d in details if d)
+    return f"{name}: {fact['value']}" + (f" ({label})" if label else "")
+
+def answers_from_xbrl(parsed, question_map=XBRL_QUESTION_MAP):
+    """
+    Maps parsed XBRL facts onto brsr_questions.json questions.
+    Returns {question_text: answer} for the questions the filing covers.
+    """
+    if not parsed:
+        return {}
+    facts = {name.lower(): values for name, values in parsed['facts'].items()}
+    contexts = parsed['contexts']
+
+    answers = {}
+    for question, elements in question_map.items():
+        lines = []
+        for element in elements:
+            values = facts.get(element.lower(), [])
+            # Entity-level totals first, then dimensional breakdowns
+            values = sorted(values, key=lambda f: len(contexts.get(f['context'], {}).get('dimensions', {})))
+            seen = set()
+            for fact in values:
+                line = _format_fact(element, fact, contexts)
+                if line not in seen:
+                    seen.add(line)
+                    lines.append(line)
+        if lines:
+            answers[question] = "\n".join(lines)
+    return answers